@@ -4,19 +4,34 @@ Model: Lykon/dreamshaper-8 (SD 1.5 fine-tune, great for cartoon/illustration).
 
 Optimized for CPU inference with:
 - ONNX Runtime (2-3x faster than PyTorch on CPU)
-- DPM++ 2M Karras scheduler (converges in 12 steps)
-- 384x384 generation with Lanczos upscale (40% fewer pixels)
-- channels_last memory format
-- Watchdog timer to auto-reset stuck busy flag
+- UniPC Karras scheduler (converges in 8 steps; DPM++ 2M Karras via SCHEDULER=dpmpp)
+- 384x384 generation with Lanczos upscale (40% fewer pixels), optionally via
+  OpenCV's SIMD resize (USE_CV2_RESIZE) or native 512x512 (NATIVE_512)
+- channels_last memory format (AVX-512 CPUs) and IPEX/bf16 autocast for the
+  PyTorch fallback when available
+- ORT_ENABLE_ALL graph optimizations (operator fusion, constant folding)
+- Optional INT8 dynamic quantization of the ONNX models (USE_INT8, VNNI CPUs only)
+- Cached CLIP embeddings for the default negative prompt and repeat prompts
+- Fast response encoding (PNG compress_level=1, SIMD base64 via pybase64)
+- Optional mmap-backed UNet weights shared through the page cache (ORT_MMAP_WEIGHTS)
+- Startup warmup generation so the first request runs on warm kernels/arenas
+- Single generation slot, held until the worker thread finishes, with a
+  per-request timeout
 """
 
 import asyncio
 import base64
+import contextlib
+import functools
 import io
+import mmap
 import os
+import shutil
 import time
-import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
+import numpy as np
 import torch
 
 # Use all available CPU threads for PyTorch inference
@@ -24,6 +39,11 @@ _num_threads = int(os.environ.get("OMP_NUM_THREADS", os.cpu_count() or 4))
 torch.set_num_threads(_num_threads)
 torch.set_num_interop_threads(max(1, _num_threads // 2))
 
+try:
+    import pybase64 as b64  # SIMD base64 encoder
+except ImportError:
+    b64 = base64
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from PIL import Image
@@ -32,32 +52,58 @@ from pydantic import BaseModel, Field
 app = FastAPI(title="Flow AI Image Server")
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
-# Track whether the server is currently generating
-_is_busy = False
-_busy_since: float = 0  # Timestamp when generation started
-_busy_lock = threading.Lock()
-BUSY_TIMEOUT_S = 1200  # 20 minutes max per generation (watchdog)
+# One generation at a time, run on a dedicated worker thread. The slot is the
+# executor job itself: a request that times out stops waiting, but the thread
+# keeps generating, and the server stays busy until it finishes.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="generate")
+_running: Optional[asyncio.Future] = None
+BUSY_TIMEOUT_S = 1200  # 20 minutes max per generation
 
 MODEL_ID = os.environ.get("MODEL_ID", "Lykon/dreamshaper-8")
 DEVICE = os.environ.get("DEVICE", "cpu")
 DTYPE = torch.float16 if DEVICE == "cuda" else torch.float32
 USE_ONNX = os.environ.get("USE_ONNX", "true").lower() in ("true", "1", "yes")
+WARMUP = os.environ.get("WARMUP", "true").lower() in ("true", "1", "yes")
+TORCH_COMPILE = os.environ.get("TORCH_COMPILE", "false").lower() in ("true", "1", "yes")
+USE_INT8 = os.environ.get("USE_INT8", "false").lower() in ("true", "1", "yes")
+ORT_MMAP_WEIGHTS = os.environ.get("ORT_MMAP_WEIGHTS", "false").lower() in ("true", "1", "yes")
+
+# ONNX sub-models that get INT8 weights when USE_INT8 is enabled
+INT8_COMPONENTS = ("unet", "text_encoder", "vae_decoder")
+
+USE_CV2_RESIZE = os.environ.get("USE_CV2_RESIZE", "false").lower() in ("true", "1", "yes")
+NATIVE_512 = os.environ.get("NATIVE_512", "false").lower() in ("true", "1", "yes")
+
+SCHEDULER = os.environ.get("SCHEDULER", "unipc").lower()  # "unipc" or "dpmpp"
 
 # Generation defaults (can be overridden per-request)
-DEFAULT_STEPS = int(os.environ.get("DEFAULT_STEPS", "12"))
-DEFAULT_WIDTH = int(os.environ.get("DEFAULT_WIDTH", "384"))
-DEFAULT_HEIGHT = int(os.environ.get("DEFAULT_HEIGHT", "384"))
-UPSCALE_TO = int(os.environ.get("UPSCALE_TO", "512"))  # 0 to disable upscaling
+DEFAULT_STEPS = int(os.environ.get("DEFAULT_STEPS", "12" if SCHEDULER == "dpmpp" else "8"))
+# High guidance needs a couple more corrector steps to converge
+HIGH_CFG_STEPS = int(os.environ.get("HIGH_CFG_STEPS", str(DEFAULT_STEPS + 2)))
+HIGH_CFG_THRESHOLD = 10.0
+if NATIVE_512:
+    # Generate at the target size directly and skip the upscale pass
+    DEFAULT_WIDTH = DEFAULT_HEIGHT = 512
+    UPSCALE_TO = 0
+else:
+    DEFAULT_WIDTH = int(os.environ.get("DEFAULT_WIDTH", "384"))
+    DEFAULT_HEIGHT = int(os.environ.get("DEFAULT_HEIGHT", "384"))
+    UPSCALE_TO = int(os.environ.get("UPSCALE_TO", "512"))  # 0 to disable upscaling
+
+DEFAULT_NEGATIVE_PROMPT = "blurry, low quality, deformed, ugly, bad anatomy, watermark, text, signature, extra limbs, extra fingers, mutated hands, poorly drawn"
 
 pipe = None
+_int8_loaded = False  # the ONNX pipeline was loaded from the INT8 copy
+_weight_maps = []  # mmaps backing ORT initializers, must outlive the sessions
+_use_bf16 = False  # PyTorch fallback runs under bf16 autocast
 
 
 class GenerateRequest(BaseModel):
     prompt: str
-    negative_prompt: str = "blurry, low quality, deformed, ugly, bad anatomy, watermark, text, signature, extra limbs, extra fingers, mutated hands, poorly drawn"
+    negative_prompt: str = DEFAULT_NEGATIVE_PROMPT
     width: int = Field(default=DEFAULT_WIDTH, ge=256, le=1536)
     height: int = Field(default=DEFAULT_HEIGHT, ge=256, le=1536)
-    num_inference_steps: int = Field(default=DEFAULT_STEPS, ge=1, le=50)
+    num_inference_steps: Optional[int] = Field(default=None, ge=1, le=50)  # None: pick from guidance_scale
     guidance_scale: float = Field(default=7.5, ge=1.0, le=20.0)
 
 
@@ -66,69 +112,302 @@ class GenerateResponse(BaseModel):
     generation_time: float  # seconds
 
 
-def _set_busy(busy: bool):
-    """Thread-safe busy flag management."""
-    global _is_busy, _busy_since
-    with _busy_lock:
-        _is_busy = busy
-        _busy_since = time.time() if busy else 0
+def make_scheduler(config):
+    """Build the configured multistep scheduler from the pipeline's scheduler config."""
+    if SCHEDULER == "dpmpp":
+        from diffusers import DPMSolverMultistepScheduler
+
+        return DPMSolverMultistepScheduler.from_config(
+            config,
+            algorithm_type="dpmsolver++",
+            use_karras_sigmas=True,
+        )
+
+    from diffusers import UniPCMultistepScheduler
+
+    return UniPCMultistepScheduler.from_config(config, solver_order=2, use_karras_sigmas=True)
+
+
+def resolve_steps(req: GenerateRequest) -> int:
+    """Explicit step counts win; otherwise pick by guidance scale."""
+    if req.num_inference_steps is not None:
+        return req.num_inference_steps
+    return HIGH_CFG_STEPS if req.guidance_scale > HIGH_CFG_THRESHOLD else DEFAULT_STEPS
+
+
+@functools.lru_cache(maxsize=64)
+def encode_text(text: str):
+    """CLIP-encode a prompt once; repeat prompts reuse the cached embedding.
+
+    Returns a numpy array for the ONNX pipeline and a tensor for PyTorch.
+    """
+    tokens = pipe.tokenizer(
+        text,
+        padding="max_length",
+        max_length=pipe.tokenizer.model_max_length,
+        truncation=True,
+        return_tensors="np",
+    )
+    if isinstance(pipe.text_encoder, torch.nn.Module):
+        with torch.no_grad():
+            input_ids = torch.from_numpy(tokens.input_ids).to(DEVICE)
+            return pipe.text_encoder(input_ids)[0].to(DTYPE)
+    return pipe.text_encoder(input_ids=tokens.input_ids.astype(np.int32))[0]
+
+
+def run_pipeline(req: GenerateRequest, steps: int):
+    """Blocking pipeline call using cached prompt embeddings."""
+    autocast = torch.autocast("cpu", dtype=torch.bfloat16) if _use_bf16 else contextlib.nullcontext()
+    with autocast:
+        return pipe(
+            prompt_embeds=encode_text(req.prompt),
+            negative_prompt_embeds=encode_text(req.negative_prompt),
+            width=req.width,
+            height=req.height,
+            num_inference_steps=steps,
+            guidance_scale=req.guidance_scale,
+        )
+
+
+def run_and_encode(req: GenerateRequest, steps: int):
+    """Generate, upscale and base64-encode; returns (base64 PNG, "WxH")."""
+    image: Image.Image = run_pipeline(req, steps).images[0]
+
+    # Upscale if generated at lower resolution
+    if UPSCALE_TO > 0 and (image.width < UPSCALE_TO or image.height < UPSCALE_TO):
+        orig_size = f"{image.width}x{image.height}"
+        image = upscale_image(image)
+        print(f"Upscaled from {orig_size} to {image.width}x{image.height}")
+
+    # Convert to base64 PNG (fast deflate: this is a transport format)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=1, optimize=False)
+    image_b64 = b64.b64encode(buffer.getbuffer()).decode("utf-8")
+    return image_b64, f"{image.width}x{image.height}"
+
+
+def warmup():
+    """Run a tiny 2-step generation at the default size.
+
+    Materializes ORT memory patterns, kernel selection and the allocator
+    arena (or torch.compile graphs) before the first real request.
+    """
+    try:
+        start = time.time()
+        run_pipeline(GenerateRequest(prompt="warmup"), steps=2)
+        print(f"Warmup complete in {time.time() - start:.1f}s")
+    except Exception as e:
+        print(f"Warmup failed: {e}")
+
+
+def upscale_image(image: Image.Image) -> Image.Image:
+    """Lanczos-upscale a generated image to UPSCALE_TO x UPSCALE_TO."""
+    if USE_CV2_RESIZE:
+        import cv2
+
+        arr = cv2.resize(np.asarray(image), (UPSCALE_TO, UPSCALE_TO), interpolation=cv2.INTER_LANCZOS4)
+        return Image.fromarray(arr)
+    return image.resize((UPSCALE_TO, UPSCALE_TO), Image.LANCZOS)
+
+
+@functools.lru_cache(maxsize=1)
+def _cpu_flags() -> str:
+    try:
+        with open("/proc/cpuinfo") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def _cpu_has_vnni() -> bool:
+    """INT8 matmuls only beat FP32 on CPUs with VNNI dot-product instructions."""
+    return "avx512_vnni" in _cpu_flags() or "avx_vnni" in _cpu_flags()
+
+
+def _cpu_has_bf16() -> bool:
+    """bf16 is only a win with native AVX512-BF16 / AMX instructions."""
+    return "avx512_bf16" in _cpu_flags() or "amx_bf16" in _cpu_flags()
+
+
+def quantize_onnx_model(src_path: str, dst_path: str):
+    """Write an INT8 copy of an exported ONNX pipeline to dst_path.
+
+    Only MatMul/Gemm weights are quantized; convolutions stay FP32 so the
+    VAE output keeps its quality. Weights are written to an external
+    model.onnx.data file next to each model.onnx.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    def skip_fp32_weights(directory, names):
+        if os.path.basename(directory) in INT8_COMPONENTS:
+            return [n for n in names if n.startswith("model.onnx")]
+        return []
+
+    tmp_path = dst_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    shutil.copytree(src_path, tmp_path, ignore=skip_fp32_weights)
+
+    for component in INT8_COMPONENTS:
+        model_file = os.path.join(src_path, component, "model.onnx")
+        if not os.path.exists(model_file):
+            continue
+        print(f"Quantizing {component} to INT8...")
+        quantize_dynamic(
+            model_input=model_file,
+            model_output=os.path.join(tmp_path, component, "model.onnx"),
+            weight_type=QuantType.QInt8,
+            op_types_to_quantize=["MatMul", "Gemm"],
+            # The FP32 convolutions alone push the UNet past protobuf's 2 GB limit
+            use_external_data_format=True,
+        )
+
+    os.replace(tmp_path, dst_path)
+
+
+def _map_external_weights(sess_options, model_path: str):
+    """Serve the UNet's external weight file from a read-only mmap.
 
+    Pages come from the shared page cache instead of a private heap copy,
+    so several server processes on one host hold the weights only once.
+    Prepacking is disabled because it would copy the weights again.
+    """
+    # optimum's export names the file model.onnx_data, quantize_dynamic model.onnx.data
+    weights_name = next(
+        (name for name in ("model.onnx_data", "model.onnx.data")
+         if os.path.exists(os.path.join(model_path, "unet", name))),
+        None,
+    )
+    if weights_name is None:
+        print("ORT_MMAP_WEIGHTS set but UNet has no external weight file, skipping")
+        return
+    weights_file = os.path.join(model_path, "unet", weights_name)
+    if not hasattr(sess_options, "add_external_initializers_from_files_in_memory"):
+        print("ORT_MMAP_WEIGHTS needs onnxruntime>=1.18, skipping")
+        return
+
+    with open(weights_file, "rb") as f:
+        weights = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _weight_maps.append(weights)
+    sess_options.add_external_initializers_from_files_in_memory(
+        [weights_name], [np.frombuffer(weights, dtype=np.uint8)], [len(weights)]
+    )
+    sess_options.add_session_config_entry("session.disable_prepacking", "1")
+    print(f"UNet weights mapped from {weights_file}")
+
+
+def _ort_session_options():
+    """Base session options for the ONNX sub-models of the pipeline."""
+    import onnxruntime as ort
+
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    sess_options.intra_op_num_threads = _num_threads
+    sess_options.enable_mem_pattern = True
+    sess_options.enable_cpu_mem_arena = True
+    # Keep worker threads spinning between the back-to-back UNet steps
+    sess_options.add_session_config_entry("session.intra_op.allow_spinning", "1")
+    return sess_options
+
+
+def load_ort_pipeline(model_path: str):
+    """Load the ONNX pipeline, giving the UNet its own session options.
+
+    With ORT_MMAP_WEIGHTS only the UNet session gets the mapped weights and
+    disabled prepacking; the text encoder and VAE keep the plain options, so
+    they stay prepacked and never resolve their own model.onnx_data to the
+    UNet's in-memory file.
+    """
+    from optimum.onnxruntime import ORTModel, ORTStableDiffusionPipeline
+
+    sess_options = _ort_session_options()
+    unet_options = _ort_session_options()
+    if ORT_MMAP_WEIGHTS:
+        _map_external_weights(unet_options, model_path)
+
+    class Pipeline(ORTStableDiffusionPipeline):
+        @staticmethod
+        def load_model(
+            vae_decoder_path,
+            text_encoder_path,
+            unet_path,
+            vae_encoder_path=None,
+            text_encoder_2_path=None,
+            provider="CPUExecutionProvider",
+            session_options=None,
+            provider_options=None,
+        ):
+            def load(path, options):
+                return ORTModel.load_model(path, provider, options, provider_options)
+
+            def load_optional(path):
+                return load(path, session_options) if path is not None and path.is_file() else None
+
+            return (
+                load(vae_decoder_path, session_options),
+                load_optional(text_encoder_path),
+                load(unet_path, unet_options),
+                load_optional(vae_encoder_path),
+                load_optional(text_encoder_2_path),
+            )
 
-def _check_busy_timeout():
-    """Check if the busy flag has been stuck for too long and auto-reset."""
-    global _is_busy, _busy_since
-    with _busy_lock:
-        if _is_busy and _busy_since > 0:
-            elapsed = time.time() - _busy_since
-            if elapsed > BUSY_TIMEOUT_S:
-                print(f"WARNING: Busy flag stuck for {elapsed:.0f}s, auto-resetting")
-                _is_busy = False
-                _busy_since = 0
-                return True
-    return False
+    return Pipeline.from_pretrained(
+        model_path,
+        provider="CPUExecutionProvider",
+        session_options=sess_options,
+    )
 
 
 @app.on_event("startup")
 async def load_model():
-    global pipe
+    global pipe, _use_bf16, _int8_loaded
     print(f"Loading model {MODEL_ID} on {DEVICE} ({DTYPE})...")
-    print(f"ONNX Runtime: {'enabled' if USE_ONNX else 'disabled'}")
+    print(f"ONNX Runtime: {'enabled' if USE_ONNX else 'disabled'}, scheduler: {SCHEDULER}")
     print(f"Default generation: {DEFAULT_WIDTH}x{DEFAULT_HEIGHT}, {DEFAULT_STEPS} steps, upscale to {UPSCALE_TO}")
     start = time.time()
 
     if USE_ONNX and DEVICE == "cpu":
         try:
             from optimum.onnxruntime import ORTStableDiffusionPipeline
-            from diffusers import DPMSolverMultistepScheduler
 
-            # Check for pre-converted ONNX model
+            # Convert to ONNX on first run, then always load from disk
             onnx_model_path = os.environ.get("ONNX_MODEL_PATH", "/models/dreamshaper-8-onnx")
-            if os.path.exists(onnx_model_path) and os.listdir(onnx_model_path):
-                print(f"Loading pre-converted ONNX model from {onnx_model_path}...")
-                pipe = ORTStableDiffusionPipeline.from_pretrained(
-                    onnx_model_path,
-                    provider="CPUExecutionProvider",
-                )
-            else:
+            if not (os.path.exists(onnx_model_path) and os.listdir(onnx_model_path)):
                 print(f"Converting {MODEL_ID} to ONNX (first run, may take a few minutes)...")
-                pipe = ORTStableDiffusionPipeline.from_pretrained(
+                exported = ORTStableDiffusionPipeline.from_pretrained(
                     MODEL_ID,
                     export=True,
                     provider="CPUExecutionProvider",
                 )
                 # Save converted model for faster subsequent loads
                 os.makedirs(onnx_model_path, exist_ok=True)
-                pipe.save_pretrained(onnx_model_path)
+                exported.save_pretrained(onnx_model_path)
+                del exported
                 print(f"ONNX model saved to {onnx_model_path}")
+
+            model_path = onnx_model_path
+            if USE_INT8:
+                if _cpu_has_vnni():
+                    model_path = onnx_model_path + "-int8"
+                    if not os.path.exists(model_path):
+                        quantize_onnx_model(onnx_model_path, model_path)
+                        print(f"INT8 model saved to {model_path}")
+                else:
+                    print("USE_INT8 set but CPU lacks VNNI, keeping FP32 model")
+
+            print(f"Loading ONNX model from {model_path}...")
+            pipe = load_ort_pipeline(model_path)
+            _int8_loaded = model_path != onnx_model_path
             # Disable safety checker (not needed for cartoon generation)
             pipe.safety_checker = None
 
-            # Use DPM++ 2M Karras scheduler (converges faster than Euler)
-            pipe.scheduler = DPMSolverMultistepScheduler.from_config(
-                pipe.scheduler.config,
-                algorithm_type="dpmsolver++",
-                use_karras_sigmas=True,
-            )
+            # Few-step multistep scheduler (converges much faster than Euler)
+            pipe.scheduler = make_scheduler(pipe.scheduler.config)
+
+            encode_text.cache_clear()
+            encode_text(DEFAULT_NEGATIVE_PROMPT)
+            if WARMUP:
+                await asyncio.get_running_loop().run_in_executor(_executor, warmup)
 
             elapsed_load = time.time() - start
             print(f"ONNX model loaded in {elapsed_load:.1f}s")
@@ -137,7 +416,7 @@ async def load_model():
             print(f"ONNX loading failed, falling back to PyTorch: {e}")
 
     # Fallback: Standard PyTorch pipeline
-    from diffusers import StableDiffusionPipeline, DPMSolverMultistepScheduler
+    from diffusers import StableDiffusionPipeline
 
     pipe = StableDiffusionPipeline.from_pretrained(
         MODEL_ID,
@@ -146,102 +425,118 @@ async def load_model():
         requires_safety_checker=False,
     )
 
-    # DPM++ 2M Karras: converges in 12 steps vs 20+ for Euler
-    pipe.scheduler = DPMSolverMultistepScheduler.from_config(
-        pipe.scheduler.config,
-        algorithm_type="dpmsolver++",
-        use_karras_sigmas=True,
-    )
+    # UniPC / DPM++ 2M Karras: converge in 8-12 steps vs 20+ for Euler
+    pipe.scheduler = make_scheduler(pipe.scheduler.config)
     pipe = pipe.to(DEVICE)
 
     # CPU optimizations
     if DEVICE == "cpu":
         pipe.enable_attention_slicing()
-        # channels_last memory format: 5-15% faster on CPU
-        pipe.unet = pipe.unet.to(memory_format=torch.channels_last)
-        pipe.vae = pipe.vae.to(memory_format=torch.channels_last)
+        # channels_last memory format: 5-15% faster on AVX-512 CPUs, can regress elsewhere
+        if "avx512" in _cpu_flags():
+            pipe.unet = pipe.unet.to(memory_format=torch.channels_last)
+            pipe.vae = pipe.vae.to(memory_format=torch.channels_last)
+
+        _use_bf16 = _cpu_has_bf16()
+        try:
+            import intel_extension_for_pytorch as ipex
+
+            ipex_dtype = torch.bfloat16 if _use_bf16 else torch.float32
+            pipe.unet = ipex.optimize(pipe.unet.eval(), dtype=ipex_dtype, inplace=True, auto_kernel_selection=True)
+            pipe.vae = ipex.optimize(pipe.vae.eval(), dtype=ipex_dtype, inplace=True)
+            print(f"IPEX optimizations applied ({ipex_dtype})")
+        except ImportError:
+            pass
+
+        if TORCH_COMPILE:
+            pipe.unet = torch.compile(pipe.unet, mode="reduce-overhead", backend="inductor")
+
+    encode_text.cache_clear()
+    encode_text(DEFAULT_NEGATIVE_PROMPT)
+    if WARMUP:
+        await asyncio.get_running_loop().run_in_executor(_executor, warmup)
 
     elapsed_load = time.time() - start
     print(f"PyTorch model loaded in {elapsed_load:.1f}s")
 
 
+def _is_busy() -> bool:
+    return _running is not None and not _running.done()
+
+
+def _log_abandoned(future: asyncio.Future):
+    """Report how a timed-out generation ended (and retrieve its exception)."""
+    if future.cancelled():
+        return
+    error = future.exception()
+    print(f"Timed-out generation finished {f'with error: {error}' if error else 'late'}")
+
+
 @app.get("/health")
 async def health():
-    _check_busy_timeout()
     return {
         "status": "ok" if pipe is not None else "loading",
         "model": MODEL_ID,
         "device": DEVICE,
-        "busy": _is_busy,
+        "busy": _is_busy(),
         "onnx": USE_ONNX,
+        "int8": _int8_loaded,
         "default_size": f"{DEFAULT_WIDTH}x{DEFAULT_HEIGHT}",
         "default_steps": DEFAULT_STEPS,
+        "scheduler": SCHEDULER,
     }
 
 
 @app.post("/reset-busy")
 async def reset_busy():
-    """Admin endpoint to manually reset the busy flag if it gets stuck."""
-    was_busy = _is_busy
-    _set_busy(False)
+    """Admin endpoint to free the slot if a generation is stuck.
+
+    The stuck thread can't be interrupted; it is left to finish on the old
+    executor and new requests run on a fresh one.
+    """
+    global _executor, _running
+    was_busy = _is_busy()
+    if was_busy:
+        _executor.shutdown(wait=False)
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="generate")
+        _running = None
     return {"reset": True, "was_busy": was_busy}
 
 
 @app.post("/generate", response_model=GenerateResponse)
 async def generate(req: GenerateRequest):
+    global _running
     if pipe is None:
         raise HTTPException(status_code=503, detail="Model not loaded yet")
 
-    # Auto-reset stuck busy flag
-    _check_busy_timeout()
-
-    if _is_busy:
+    if _is_busy():
         raise HTTPException(
             status_code=503,
             detail="Server is busy generating another image. Please retry later.",
         )
 
-    _set_busy(True)
-    start = time.time()
+    steps = resolve_steps(req)
 
+    start = time.time()
+    # Run the blocking pipeline and encoding in a thread so the event loop stays responsive
+    loop = asyncio.get_running_loop()
+    _running = job = loop.run_in_executor(_executor, run_and_encode, req, steps)
     try:
-        # Run the blocking pipeline in a thread so the event loop stays responsive
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: pipe(
-                prompt=req.prompt,
-                negative_prompt=req.negative_prompt,
-                width=req.width,
-                height=req.height,
-                num_inference_steps=req.num_inference_steps,
-                guidance_scale=req.guidance_scale,
-            ),
-        )
-
-        image: Image.Image = result.images[0]
-
-        # Upscale if generated at lower resolution
-        if UPSCALE_TO > 0 and (image.width < UPSCALE_TO or image.height < UPSCALE_TO):
-            orig_size = f"{image.width}x{image.height}"
-            image = image.resize((UPSCALE_TO, UPSCALE_TO), Image.LANCZOS)
-            print(f"Upscaled from {orig_size} to {image.width}x{image.height}")
-
-        # Convert to base64 PNG
-        buffer = io.BytesIO()
-        image.save(buffer, format="PNG")
-        b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+        # shield: a timeout must not mark the job done while its thread still runs
+        image_b64, out_size = await asyncio.wait_for(asyncio.shield(job), timeout=BUSY_TIMEOUT_S)
 
         elapsed = time.time() - start
-        print(f"Generated {req.width}x{req.height} -> {image.width}x{image.height} in {elapsed:.1f}s ({req.num_inference_steps} steps)")
+        print(f"Generated {req.width}x{req.height} -> {out_size} in {elapsed:.1f}s ({steps} steps)")
 
-        return GenerateResponse(image=b64, generation_time=elapsed)
+        return GenerateResponse(image=image_b64, generation_time=elapsed)
+    except asyncio.TimeoutError:
+        print(f"Generation timed out after {BUSY_TIMEOUT_S}s, still busy until it finishes")
+        job.add_done_callback(_log_abandoned)
+        raise HTTPException(status_code=504, detail="Generation timed out")
     except Exception as e:
         elapsed = time.time() - start
         print(f"Generation failed after {elapsed:.1f}s: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        _set_busy(False)
 
 
 if __name__ == "__main__":
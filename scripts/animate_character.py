@@ -15,17 +15,19 @@ Without TorchServe, a simple auto-skeleton is generated from the image dimension
 """
 
 import argparse
+import importlib.util
 import json
 import os
 import sys
 import yaml
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import cv2
 import numpy as np
 import requests as http_requests
-from skimage import measure
-from scipy import ndimage
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Add AnimatedDrawings to path - check common locations
 ANIMATED_DRAWINGS_PATHS = [
@@ -58,9 +60,40 @@ MOTION_CONFIGS = {
     "dance": {"motion": "jesse_dance.yaml", "retarget": "mixamo_fff.yaml"},
 }
 
+# Skeleton table, image reading and TorchServe upload helpers shared with
+# prepare-character.py (its filename is not a module name, so load it by path)
+_prepare_spec = importlib.util.spec_from_file_location(
+    "prepare_character", Path(__file__).resolve().parent / "prepare-character.py"
+)
+_prepare_character = importlib.util.module_from_spec(_prepare_spec)
+_prepare_spec.loader.exec_module(_prepare_character)
+
+POSE_SKELETON = _prepare_character.POSE_SKELETON
+_POSE_KPT_A = _prepare_character._POSE_KPT_A
+_POSE_KPT_B = _prepare_character._POSE_KPT_B
+_YamlDumper = _prepare_character._YamlDumper
+MAX_RIG_DIM = _prepare_character.MAX_RIG_DIM
+read_image_reduced = _prepare_character.read_image_reduced
+encode_for_torchserve = _prepare_character.encode_for_torchserve
+min_channel = _prepare_character.min_channel
+
 # TorchServe endpoint
 TORCHSERVE_URL = os.environ.get("TORCHSERVE_URL", "http://localhost:8080")
 
+# Keep-alive session shared by every TorchServe call. There is no /ping probe:
+# the first real request fails fast (short connect timeout) when it is down.
+_ts_session = http_requests.Session()
+_ts_session.headers.update({"Connection": "keep-alive"})
+_ts_session.mount(
+    "http://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
+        max_retries=Retry(total=1, connect=1, read=0, backoff_factor=0.05),
+    ),
+)
+TORCHSERVE_TIMEOUT = (3, 30)  # (connect, read) seconds
+
 # AnimatedDrawings root path
 AD_ROOT = None
 for ad_path in ANIMATED_DRAWINGS_PATHS:
@@ -72,13 +105,10 @@ if AD_ROOT is None:
     AD_ROOT = Path(r"C:\Users\koffi\Dev\AnimatedDrawings")
 
 
-def is_torchserve_running() -> bool:
-    """Check if TorchServe Docker container is running and healthy."""
-    try:
-        resp = http_requests.get(f"{TORCHSERVE_URL}/ping", timeout=3)
-        return resp.status_code == 200
-    except Exception:
-        return False
+def write_yaml(path: Path, data: dict) -> None:
+    """Dump plain config data with the libyaml C emitter when available."""
+    with open(path, "w") as f:
+        yaml.dump(data, f, Dumper=_YamlDumper, default_flow_style=False)
 
 
 def auto_detect_and_rig(img_path: str, char_dir: Path) -> bool:
@@ -88,24 +118,22 @@ def auto_detect_and_rig(img_path: str, char_dir: Path) -> bool:
     """
     char_dir.mkdir(parents=True, exist_ok=True)
 
-    # Read and resize image
-    img = cv2.imread(img_path)
+    # Read (decoder-downscaled for large inputs) and resize image
+    img = read_image_reduced(img_path, MAX_RIG_DIM)
     if img is None:
         return False
 
-    cv2.imwrite(str(char_dir / "image.png"), img)
-
-    if np.max(img.shape) > 1000:
-        scale = 1000 / np.max(img.shape)
+    if max(img.shape[:2]) > MAX_RIG_DIM:
+        scale = MAX_RIG_DIM / max(img.shape[:2])
         img = cv2.resize(img, (round(scale * img.shape[1]), round(scale * img.shape[0])))
 
     # Step 1: Detect drawn humanoid
-    img_bytes = cv2.imencode(".png", img)[1].tobytes()
+    img_bytes = encode_for_torchserve(img)
     try:
-        resp = http_requests.post(
+        resp = _ts_session.post(
             f"{TORCHSERVE_URL}/predictions/drawn_humanoid_detector",
             files={"data": img_bytes},
-            timeout=30,
+            timeout=TORCHSERVE_TIMEOUT,
         )
         if resp.status_code >= 300:
             print(f"Detection failed: {resp.status_code}", file=sys.stderr)
@@ -124,24 +152,27 @@ def auto_detect_and_rig(img_path: str, char_dir: Path) -> bool:
     bbox = np.array(detection_results[0]["bbox"])
     l, t, r, b = [round(x) for x in bbox]
 
-    # Save bounding box
-    with open(str(char_dir / "bounding_box.yaml"), "w") as f:
-        yaml.dump({"left": l, "top": t, "right": r, "bottom": b}, f)
-
     # Crop character
     cropped = img[t:b, l:r]
 
-    # Step 2: Segment the character
-    mask = segment_character(cropped)
-
-    # Step 3: Estimate pose
-    cropped_bytes = cv2.imencode(".png", cropped)[1].tobytes()
-    try:
-        resp = http_requests.post(
+    # Steps 2+3: segment locally while the pose request is in flight
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pose_future = pool.submit(
+            _ts_session.post,
             f"{TORCHSERVE_URL}/predictions/drawn_humanoid_pose_estimator",
-            files={"data": cropped_bytes},
-            timeout=30,
+            files={"data": encode_for_torchserve(cropped)},
+            timeout=TORCHSERVE_TIMEOUT,
         )
+
+        mask = segment_character(cropped)
+
+        # Save texture (RGBA) and mask; neither depends on the pose
+        cropped_rgba = cv2.cvtColor(cropped, cv2.COLOR_BGR2BGRA)
+        cv2.imwrite(str(char_dir / "texture.png"), cropped_rgba)
+        cv2.imwrite(str(char_dir / "mask.png"), mask)
+
+    try:
+        resp = pose_future.result()
         if resp.status_code >= 300:
             print(f"Pose estimation failed: {resp.status_code}", file=sys.stderr)
             return False
@@ -156,36 +187,16 @@ def auto_detect_and_rig(img_path: str, char_dir: Path) -> bool:
 
     # Build skeleton from keypoints
     kpts = np.array(pose_results[0]["keypoints"])[:, :2]
+    locs = np.rint((kpts[_POSE_KPT_A] + kpts[_POSE_KPT_B]) / 2).astype(int).tolist()
     skeleton = [
-        {"loc": [round(x) for x in (kpts[11] + kpts[12]) / 2], "name": "root", "parent": None},
-        {"loc": [round(x) for x in (kpts[11] + kpts[12]) / 2], "name": "hip", "parent": "root"},
-        {"loc": [round(x) for x in (kpts[5] + kpts[6]) / 2], "name": "torso", "parent": "hip"},
-        {"loc": [round(x) for x in kpts[0]], "name": "neck", "parent": "torso"},
-        {"loc": [round(x) for x in kpts[6]], "name": "right_shoulder", "parent": "torso"},
-        {"loc": [round(x) for x in kpts[8]], "name": "right_elbow", "parent": "right_shoulder"},
-        {"loc": [round(x) for x in kpts[10]], "name": "right_hand", "parent": "right_elbow"},
-        {"loc": [round(x) for x in kpts[5]], "name": "left_shoulder", "parent": "torso"},
-        {"loc": [round(x) for x in kpts[7]], "name": "left_elbow", "parent": "left_shoulder"},
-        {"loc": [round(x) for x in kpts[9]], "name": "left_hand", "parent": "left_elbow"},
-        {"loc": [round(x) for x in kpts[12]], "name": "right_hip", "parent": "root"},
-        {"loc": [round(x) for x in kpts[14]], "name": "right_knee", "parent": "right_hip"},
-        {"loc": [round(x) for x in kpts[16]], "name": "right_foot", "parent": "right_knee"},
-        {"loc": [round(x) for x in kpts[11]], "name": "left_hip", "parent": "root"},
-        {"loc": [round(x) for x in kpts[13]], "name": "left_knee", "parent": "left_hip"},
-        {"loc": [round(x) for x in kpts[15]], "name": "left_foot", "parent": "left_knee"},
+        {"loc": loc, "name": name, "parent": parent}
+        for loc, (name, parent, _) in zip(locs, POSE_SKELETON)
     ]
 
-    # Save texture (RGBA)
-    cropped_rgba = cv2.cvtColor(cropped, cv2.COLOR_BGR2BGRA)
-    cv2.imwrite(str(char_dir / "texture.png"), cropped_rgba)
-
-    # Save mask
-    cv2.imwrite(str(char_dir / "mask.png"), mask)
-
-    # Save character config
+    # Save bounding box and character config
+    write_yaml(char_dir / "bounding_box.yaml", {"left": l, "top": t, "right": r, "bottom": b})
     char_cfg = {"skeleton": skeleton, "height": cropped.shape[0], "width": cropped.shape[1]}
-    with open(str(char_dir / "char_cfg.yaml"), "w") as f:
-        yaml.dump(char_cfg, f)
+    write_yaml(char_dir / "char_cfg.yaml", char_cfg)
 
     print(f"Auto-rigged character: {cropped.shape[1]}x{cropped.shape[0]}, {len(skeleton)} joints")
     return True
@@ -193,54 +204,39 @@ def auto_detect_and_rig(img_path: str, char_dir: Path) -> bool:
 
 def segment_character(img: np.ndarray) -> np.ndarray:
     """Segment the character from the background using thresholding."""
-    gray = np.min(img, axis=2)
-    gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 115, 8)
-    gray = cv2.bitwise_not(gray)
+    darkest = min_channel(img)
+    # THRESH_BINARY_INV == THRESH_BINARY followed by bitwise_not, in one pass
+    gray = cv2.adaptiveThreshold(darkest, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 115, 8)
 
     kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
     gray = cv2.morphologyEx(gray, cv2.MORPH_CLOSE, kernel, iterations=2)
     gray = cv2.morphologyEx(gray, cv2.MORPH_DILATE, kernel, iterations=2)
 
-    # Floodfill from edges
-    mask = np.zeros([gray.shape[0] + 2, gray.shape[1] + 2], np.uint8)
-    mask[1:-1, 1:-1] = gray.copy()
-
-    im_floodfill = np.full(gray.shape, 255, np.uint8)
-    h, w = gray.shape[:2]
-    for x in range(0, w - 1, 10):
-        cv2.floodFill(im_floodfill, mask, (x, 0), 0)
-        cv2.floodFill(im_floodfill, mask, (x, h - 1), 0)
-    for y in range(0, h - 1, 10):
-        cv2.floodFill(im_floodfill, mask, (0, y), 0)
-        cv2.floodFill(im_floodfill, mask, (w - 1, y), 0)
-
-    im_floodfill[0, :] = 0
-    im_floodfill[-1, :] = 0
-    im_floodfill[:, 0] = 0
-    im_floodfill[:, -1] = 0
-
-    mask2 = cv2.bitwise_not(im_floodfill)
-    final_mask = None
-    biggest = 0
-
-    contours = measure.find_contours(mask2, 0.0)
-    for c in contours:
-        x = np.zeros(mask2.T.shape, np.uint8)
-        cv2.fillPoly(x, [np.int32(c)], 1)
-        size = len(np.where(x == 1)[0])
-        if size > biggest:
-            final_mask = x
-            biggest = size
-
-    if final_mask is None:
+    # Background: unmasked pixels 4-connected to the image border
+    _, labels = cv2.connectedComponents((gray == 0).astype(np.uint8), connectivity=4)
+    border_labels = np.unique(np.concatenate((labels[0], labels[-1], labels[:, 0], labels[:, -1])))
+    border_labels = border_labels[border_labels != 0]
+
+    mask2 = np.isin(labels, border_labels).astype(np.uint8) * 255
+    mask2[0, :] = 255
+    mask2[-1, :] = 255
+    mask2[:, 0] = 255
+    mask2[:, -1] = 255
+
+    # Keep the largest foreground blob (area from the contour, no per-blob raster)
+    contours, _ = cv2.findContours(cv2.bitwise_not(mask2), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
         # Fallback: use simple threshold
-        _, final_mask = cv2.threshold(np.min(img, axis=2), 240, 255, cv2.THRESH_BINARY_INV)
+        _, final_mask = cv2.threshold(darkest, 240, 255, cv2.THRESH_BINARY_INV)
         return final_mask
 
-    final_mask = ndimage.binary_fill_holes(final_mask).astype(int)
-    final_mask = 255 * final_mask.astype(np.uint8)
+    final_mask = np.zeros(mask2.shape, np.uint8)
+    cv2.drawContours(final_mask, [max(contours, key=cv2.contourArea)], -1, 1, thickness=cv2.FILLED)
 
-    return final_mask.T
+    # Fill holes: flood the background from a corner (always background, since
+    # the border belongs to mask2); everything the flood misses is character
+    cv2.floodFill(final_mask, None, (0, 0), 2)
+    return cv2.compare(final_mask, 2, cv2.CMP_NE)
 
 
 def create_simple_skeleton(width: int, height: int) -> list:
@@ -317,8 +313,7 @@ def prepare_character_simple(input_path: str, char_dir: Path) -> None:
 
     skeleton = create_simple_skeleton(width, height)
     char_cfg = {"width": width, "height": height, "skeleton": skeleton}
-    with open(char_dir / "char_cfg.yaml", "w") as f:
-        yaml.dump(char_cfg, f, default_flow_style=False)
+    write_yaml(char_dir / "char_cfg.yaml", char_cfg)
 
 
 def create_render_config(char_dir: Path, motion: str, output_path: str) -> Path:
@@ -351,8 +346,7 @@ def create_render_config(char_dir: Path, motion: str, output_path: str) -> Path:
     }
 
     config_path = char_dir / "render_config.yaml"
-    with open(config_path, "w") as f:
-        yaml.dump(config, f, default_flow_style=False)
+    write_yaml(config_path, config)
 
     return config_path
 
@@ -373,17 +367,12 @@ def animate(input_path: str, output_path: str, motion: str, duration: float) ->
             char_dir = input_p.parent
             print(f"Using pre-rigged character from {char_dir}")
         else:
-            # Try TorchServe auto-rigging first (best quality)
-            use_torchserve = is_torchserve_running()
-
-            if use_torchserve:
-                print("TorchServe detected - using automatic character detection + pose estimation")
-                success = auto_detect_and_rig(input_path, char_dir)
-                if not success:
-                    print("Auto-rigging failed, falling back to simple skeleton")
-                    prepare_character_simple(input_path, char_dir)
-            else:
-                print("TorchServe not running - using simple auto-skeleton")
+            # Try TorchServe auto-rigging first (best quality); any connection
+            # error or bad response falls back to the simple skeleton
+            print("Trying TorchServe automatic character detection + pose estimation")
+            success = auto_detect_and_rig(input_path, char_dir)
+            if not success:
+                print("Auto-rigging unavailable or failed, falling back to simple skeleton")
                 prepare_character_simple(input_path, char_dir)
 
         # Create render config
@@ -4,13 +4,22 @@ Batch render all downloaded 3D models into the character library.
 
 Usage:
     python scripts/batch-render-3d.py
+
+Thumbnails use Pillow's LANCZOS resize; pillow-simd is a drop-in replacement
+with SSE4/AVX2 resampling kernels:
+    pip uninstall -y pillow && pip install pillow-simd
 """
 
+import collections
+import functools
 import json
 import os
+import re
 import subprocess
 import sys
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
@@ -99,12 +108,38 @@ KENNEY_CHARS = [
 ]
 
 
+# Simple humanoid skeleton for rendered 3D characters:
+# (name, parent, x offset from center as a fraction of width, y as a fraction of height)
+_SKELETON_TEMPLATE = (
+    ("root", None, 0.0, 0.55),
+    ("hip", "root", 0.0, 0.55),
+    ("torso", "hip", 0.0, 0.40),
+    ("neck", "torso", 0.0, 0.22),
+    ("right_shoulder", "torso", -0.2, 0.40),
+    ("right_elbow", "right_shoulder", -0.25, 0.50),
+    ("right_hand", "right_elbow", -0.28, 0.58),
+    ("left_shoulder", "torso", 0.2, 0.40),
+    ("left_elbow", "left_shoulder", 0.25, 0.50),
+    ("left_hand", "left_elbow", 0.28, 0.58),
+    ("right_hip", "root", -0.1, 0.55),
+    ("right_knee", "right_hip", -0.1, 0.75),
+    ("right_foot", "right_knee", -0.1, 0.93),
+    ("left_hip", "root", 0.1, 0.55),
+    ("left_knee", "left_hip", 0.1, 0.75),
+    ("left_foot", "left_knee", 0.1, 0.93),
+)
+_SKELETON_FRACTIONS = [(dx, fy) for _, _, dx, fy in _SKELETON_TEMPLATE]
+
+
+@functools.lru_cache(maxsize=1)
 def find_blender() -> str:
     """Find Blender executable."""
-    paths = [
-        r"C:\Program Files\Blender Foundation\Blender 5.0\blender.exe",
-        r"C:\Program Files\Blender Foundation\Blender\blender.exe",
-    ]
+    paths = []
+    if sys.platform == "win32":
+        paths = [
+            r"C:\Program Files\Blender Foundation\Blender 5.0\blender.exe",
+            r"C:\Program Files\Blender Foundation\Blender\blender.exe",
+        ]
     for p in paths:
         if os.path.exists(p):
             return p
@@ -115,7 +150,54 @@ def find_blender() -> str:
     sys.exit(1)
 
 
-def render_glb(blender_path, model_path, output_dir, render_script, animation=None):
+# Ids of the old fake-3d entries (2D renders with shading), matched in one regex pass
+FAKE_3D_PREFIXES = ("3d-boy-", "3d-girl-", "3d-man-", "3d-woman-", "3d-warrior-", "3d-monster-", "3d-dino-", "3d-astronaut")
+_FAKE_3D_RE = re.compile("|".join(re.escape(p) for p in FAKE_3D_PREFIXES))
+
+
+# Blender log lines worth echoing while rendering
+BLENDER_LOG_KEYS = ("Render engine:", "Using animation:", "Rendered frame", "Done!", "FAILED", "Error")
+
+
+def scan_dir(path) -> dict:
+    """Map entry names to os.DirEntry for one directory (empty if missing)."""
+    try:
+        with os.scandir(path) as it:
+            return {entry.name: entry for entry in it}
+    except FileNotFoundError:
+        return {}
+
+
+def pillow_backend() -> str:
+    """Describe the installed Pillow build (pillow-simd versions carry a .postN suffix)."""
+    try:
+        import PIL
+    except ImportError:
+        return "not installed"
+    flavor = "pillow-simd" if ".post" in PIL.__version__ else "Pillow"
+    return f"{flavor} {PIL.__version__}"
+
+
+def remove_dir(path: Path) -> bool:
+    """rmtree a directory if it exists. Returns True if it was there."""
+    if not path.is_dir():
+        return False
+    shutil.rmtree(str(path), ignore_errors=True)
+    return True
+
+
+def count_gpus() -> int:
+    """Number of NVIDIA GPUs visible to Blender (0 if none / no nvidia-smi)."""
+    if not shutil.which("nvidia-smi"):
+        return 0
+    try:
+        result = subprocess.run(["nvidia-smi", "-L"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return 0
+    return sum(1 for line in result.stdout.splitlines() if line.startswith("GPU "))
+
+
+def render_glb(blender_path, model_path, output_dir, render_script, animation=None, label="", gpu=None):
     """Render a GLB model using Blender."""
     cmd = [
         blender_path, "-b", "-P", str(render_script),
@@ -125,19 +207,47 @@ def render_glb(blender_path, model_path, output_dir, render_script, animation=No
     if animation:
         cmd.extend(["--animation", animation])
 
-    result = subprocess.run(cmd, capture_output=True, text=True, timeout=180)
-    if result.returncode != 0:
-        print(f"  FAILED:")
-        for line in result.stderr.strip().split("\n")[-5:]:
-            print(f"    {line}")
+    env = None
+    if gpu is not None:
+        env = {**os.environ, "CUDA_VISIBLE_DEVICES": str(gpu)}
+
+    # Stream Blender's (very chatty) output instead of buffering it all:
+    # key stdout lines are printed live, only the stderr tail is kept
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1, env=env,
+    )
+    stderr_tail = collections.deque(maxlen=5)
+    stderr_reader = threading.Thread(target=stderr_tail.extend, args=(proc.stderr,), daemon=True)
+    stdout_reader = threading.Thread(target=_print_key_lines, args=(proc.stdout, label), daemon=True)
+    stderr_reader.start()
+    stdout_reader.start()
+
+    try:
+        returncode = proc.wait(timeout=180)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        print(f"  {label}FAILED: Blender timed out after 180s")
+        return False
+    finally:
+        stdout_reader.join()
+        stderr_reader.join()
+
+    if returncode != 0:
+        print(f"  {label}FAILED:")
+        for line in stderr_tail:
+            print(f"  {label}  {line.rstrip()}")
         return False
-    # Print key output lines
-    for line in result.stdout.split("\n"):
-        if any(k in line for k in ["Render engine:", "Using animation:", "Rendered frame", "Done!", "FAILED", "Error"]):
-            print(f"  {line.strip()}")
     return True
 
 
+def _print_key_lines(stream, label):
+    """Print the interesting lines of a Blender log stream as they arrive."""
+    for line in stream:
+        if any(k in line for k in BLENDER_LOG_KEYS):
+            print(f"  {label}{line.strip()}")
+
+
 def create_mask_and_skeleton(char_dir):
     """Create mask.png and char_cfg.yaml for AnimatedDrawings compatibility."""
     texture_path = char_dir / "texture.png"
@@ -148,42 +258,33 @@ def create_mask_and_skeleton(char_dir):
         from PIL import Image
         import numpy as np
 
-        img = Image.open(str(texture_path)).convert("RGBA")
+        img = Image.open(str(texture_path))
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
         width, height = img.size
 
-        # Mask from alpha channel
-        alpha = np.array(img)[:, :, 3]
-        mask = ((alpha > 10).astype(np.uint8)) * 255
-        mask_img = Image.fromarray(mask, mode="L")
-        mask_img.save(str(char_dir / "mask.png"))
+        # Mask from alpha channel (single band, not the full RGBA buffer)
+        alpha = np.asarray(img.getchannel("A"))
+        mask = np.greater(alpha, 10).view(np.uint8)  # 0/1 bytes, no copy
+        mask *= 255
+        Image.fromarray(mask, mode="L").save(str(char_dir / "mask.png"))
 
-        # Simple humanoid skeleton
-        cx = width // 2
+        # Simple humanoid skeleton: x = center + int(width * dx), y = int(height * fy)
+        offsets = np.multiply(_SKELETON_FRACTIONS, (width, height)).astype(int)
+        offsets[:, 0] += width // 2
         skeleton = [
-            {"loc": [cx, int(height * 0.55)], "name": "root", "parent": None},
-            {"loc": [cx, int(height * 0.55)], "name": "hip", "parent": "root"},
-            {"loc": [cx, int(height * 0.40)], "name": "torso", "parent": "hip"},
-            {"loc": [cx, int(height * 0.22)], "name": "neck", "parent": "torso"},
-            {"loc": [cx - int(width * 0.2), int(height * 0.40)], "name": "right_shoulder", "parent": "torso"},
-            {"loc": [cx - int(width * 0.25), int(height * 0.50)], "name": "right_elbow", "parent": "right_shoulder"},
-            {"loc": [cx - int(width * 0.28), int(height * 0.58)], "name": "right_hand", "parent": "right_elbow"},
-            {"loc": [cx + int(width * 0.2), int(height * 0.40)], "name": "left_shoulder", "parent": "torso"},
-            {"loc": [cx + int(width * 0.25), int(height * 0.50)], "name": "left_elbow", "parent": "left_shoulder"},
-            {"loc": [cx + int(width * 0.28), int(height * 0.58)], "name": "left_hand", "parent": "left_elbow"},
-            {"loc": [cx - int(width * 0.1), int(height * 0.55)], "name": "right_hip", "parent": "root"},
-            {"loc": [cx - int(width * 0.1), int(height * 0.75)], "name": "right_knee", "parent": "right_hip"},
-            {"loc": [cx - int(width * 0.1), int(height * 0.93)], "name": "right_foot", "parent": "right_knee"},
-            {"loc": [cx + int(width * 0.1), int(height * 0.55)], "name": "left_hip", "parent": "root"},
-            {"loc": [cx + int(width * 0.1), int(height * 0.75)], "name": "left_knee", "parent": "left_hip"},
-            {"loc": [cx + int(width * 0.1), int(height * 0.93)], "name": "left_foot", "parent": "left_knee"},
+            {"loc": [int(x), int(y)], "name": name, "parent": parent}
+            for (name, parent, _, _), (x, y) in zip(_SKELETON_TEMPLATE, offsets)
         ]
 
-        # Write YAML manually (no yaml dependency needed)
-        with open(char_dir / "char_cfg.yaml", "w") as f:
-            f.write(f"width: {width}\nheight: {height}\nskeleton:\n")
-            for joint in skeleton:
-                f.write(f"- loc: {joint['loc']}\n  name: {joint['name']}\n")
-                f.write(f"  parent: {'null' if joint['parent'] is None else joint['parent']}\n")
+        # Write YAML manually (no yaml dependency needed), in a single write
+        lines = [f"width: {width}\nheight: {height}\nskeleton:\n"]
+        lines.extend(
+            f"- loc: {joint['loc']}\n  name: {joint['name']}\n"
+            f"  parent: {'null' if joint['parent'] is None else joint['parent']}\n"
+            for joint in skeleton
+        )
+        (char_dir / "char_cfg.yaml").write_text("".join(lines))
 
         return True
     except Exception as e:
@@ -196,29 +297,97 @@ def ensure_thumbnail(char_dir):
     thumbnail = char_dir / "thumbnail.png"
     texture = char_dir / "texture.png"
 
-    if thumbnail.exists() and thumbnail.stat().st_size > 100:
-        return
+    try:
+        if thumbnail.stat().st_size > 100:
+            return
+    except FileNotFoundError:
+        pass
 
     if not texture.exists():
         return
 
     try:
         from PIL import Image
-        import numpy as np
 
-        img = Image.open(str(texture)).convert("RGBA")
+        img = Image.open(str(texture))
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
         w, h = img.size
         size = 256
-        scale = min(size / w, size / h)
-        new_w, new_h = int(w * scale), int(h * scale)
-        resized = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
+        if w > size or h > size:
+            # In-place, aspect-preserving downscale (no intermediate resize copy)
+            img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        else:
+            scale = min(size / w, size / h)
+            img = img.resize((int(w * scale), int(h * scale)), Image.Resampling.LANCZOS)
 
         canvas = Image.new("RGBA", (size, size), (0, 0, 0, 0))
-        canvas.paste(resized, ((size - new_w) // 2, (size - new_h) // 2))
+        canvas.paste(img, ((size - img.width) // 2, (size - img.height) // 2))
         canvas.save(str(thumbnail))
     except Exception as e:
         print(f"  Thumbnail error: {e}")
-        shutil.copy2(str(texture), str(thumbnail))
+        # Hardlink is a metadata-only op; copy where links are unsupported or it exists
+        try:
+            os.link(str(texture), str(thumbnail))
+        except OSError:
+            shutil.copy2(str(texture), str(thumbnail))
+
+
+def render_one(char, blender, model_path, char_dir, render_script, finalize_pool, gpu=None):
+    """
+    Render one character with Blender, then queue its mask/thumbnail work on
+    finalize_pool so this worker can start the next render. Returns the
+    finalize future (resolving to the manifest row), or None on failure.
+    """
+    char_dir.mkdir(parents=True, exist_ok=True)
+
+    label = f"[{char['id']}] "
+    if not render_glb(blender, model_path, char_dir, render_script, char.get("animation"), label, gpu):
+        return None
+
+    return finalize_pool.submit(finalize_one, char, char_dir)
+
+
+def finalize_one(char, char_dir):
+    """Create mask, skeleton and thumbnail for a rendered character. Returns its manifest row, or None."""
+    char_id = char["id"]
+    label = f"[{char_id}] "
+
+    # Create mask and skeleton for AnimatedDrawings
+    create_mask_and_skeleton(char_dir)
+    ensure_thumbnail(char_dir)
+
+    if not (char_dir / "texture.png").exists():
+        print(f"  {label}ERROR: No texture.png produced")
+        return None
+
+    print(f"  {label}OK!")
+    return {
+        "id": char_id,
+        "name": char["name"],
+        "category": "3d",
+        "tags": char["tags"],
+        "thumbnail": f"/characters/{char_id}/thumbnail.png",
+        "texturePath": f"/characters/{char_id}/texture.png",
+        "isPreRigged": True,
+    }
+
+
+def write_manifest(manifest_path: Path, manifest: dict) -> None:
+    """
+    Write manifest.json, with orjson when available (same 2-space layout).
+
+    Written to a temporary file and swapped in, so a crash mid-write never leaves a
+    truncated manifest behind.
+    """
+    try:
+        import orjson
+        data = orjson.dumps(manifest, option=orjson.OPT_INDENT_2)
+    except ImportError:
+        data = json.dumps(manifest, indent=2).encode()
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, manifest_path)
 
 
 def main():
@@ -229,6 +398,7 @@ def main():
     blender = find_blender()
 
     print(f"Blender: {blender}")
+    print(f"Imaging: {pillow_backend()}")
     print(f"Models cache: {cache_dir}")
     print(f"Output: {output_dir}")
     print()
@@ -244,26 +414,35 @@ def main():
     if "3d" not in manifest["categories"]:
         manifest["categories"].append("3d")
 
-    existing_ids = {c["id"] for c in manifest["characters"]}
+    # Characters keyed by id (insertion-ordered); written back as a list at the end
+    by_id = {c["id"]: c for c in manifest["characters"]}
 
     # Remove old fake-3d entries (the 2D ones with shading)
-    old_3d_ids = {c["id"] for c in manifest["characters"] if c["category"] == "3d"}
-    fake_3d_prefixes = ("3d-boy-", "3d-girl-", "3d-man-", "3d-woman-", "3d-warrior-", "3d-monster-", "3d-dino-", "3d-astronaut")
+    old_3d_ids = [c["id"] for c in by_id.values() if c["category"] == "3d"]
+    stale_dirs = []
     for old_id in old_3d_ids:
-        if any(old_id.startswith(p) for p in fake_3d_prefixes):
-            manifest["characters"] = [c for c in manifest["characters"] if c["id"] != old_id]
-            existing_ids.discard(old_id)
-            # Also remove directory
-            old_dir = output_dir / old_id
-            if old_dir.exists():
-                shutil.rmtree(str(old_dir), ignore_errors=True)
-                print(f"  Removed old fake-3d: {old_id}")
+        if _FAKE_3D_RE.match(old_id):
+            del by_id[old_id]
+            stale_dirs.append(output_dir / old_id)
+
+    # Also remove directories (unlink-bound, so delete them concurrently)
+    if stale_dirs:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for old_dir, removed in zip(stale_dirs, pool.map(remove_dir, stale_dirs)):
+                if removed:
+                    print(f"  Removed old fake-3d: {old_dir.name}")
 
     successful = 0
     total = len(CHARACTERS_3D)
 
     print(f"=== Rendering {total} 3D Characters ===\n")
 
+    # One directory listing each instead of per-character exists() stats
+    char_entries = scan_dir(output_dir)
+    model_entries = scan_dir(cache_dir)
+
+    # Blender renders are independent: queue them all, then run in parallel
+    tasks = []
     for i, char in enumerate(CHARACTERS_3D, 1):
         char_id = char["id"]
         char_dir = output_dir / char_id
@@ -272,44 +451,41 @@ def main():
         print(f"[{i}/{total}] {char['name']} ({char_id})")
 
         # Skip if already exists
-        if char_id in existing_ids and (char_dir / "texture.png").exists():
+        if char_id in by_id and char_id in char_entries and "texture.png" in scan_dir(char_dir):
             print(f"  Already exists, skipping")
             successful += 1
             continue
 
-        if not model_path.exists():
+        if char["model_file"] not in model_entries:
             print(f"  Model not found: {model_path}")
             continue
 
-        char_dir.mkdir(parents=True, exist_ok=True)
-
-        # Render with Blender
-        if not render_glb(blender, model_path, char_dir, render_script, char.get("animation")):
-            continue
-
-        # Create mask and skeleton for AnimatedDrawings
-        create_mask_and_skeleton(char_dir)
-        ensure_thumbnail(char_dir)
-
-        if not (char_dir / "texture.png").exists():
-            print(f"  ERROR: No texture.png produced")
-            continue
-
-        # Add to manifest
-        if char_id not in existing_ids:
-            manifest["characters"].append({
-                "id": char_id,
-                "name": char["name"],
-                "category": "3d",
-                "tags": char["tags"],
-                "thumbnail": f"/characters/{char_id}/thumbnail.png",
-                "texturePath": f"/characters/{char_id}/texture.png",
-                "isPreRigged": True,
-            })
-            existing_ids.add(char_id)
-
-        successful += 1
-        print(f"  OK!")
+        tasks.append((char, model_path, char_dir))
+
+    if tasks:
+        ngpus = count_gpus()
+        workers = min(len(tasks), os.cpu_count() or 1)
+        print(f"\nRendering {len(tasks)} models with {workers} parallel Blender process(es)...")
+
+        # Mask/thumbnail PIL work overlaps with the next Blender renders
+        with ThreadPoolExecutor(max_workers=2) as finalize_pool:
+            with ThreadPoolExecutor(max_workers=workers) as render_pool:
+                futures = [
+                    render_pool.submit(
+                        render_one, char, blender, model_path, char_dir, render_script,
+                        finalize_pool, idx % ngpus if ngpus else None,
+                    )
+                    for idx, (char, model_path, char_dir) in enumerate(tasks)
+                ]
+                finalize_futures = [f.result() for f in futures]
+            rows = [f.result() if f is not None else None for f in finalize_futures]
+
+        # Add to manifest (in definition order, on this thread only)
+        for row in rows:
+            if row is None:
+                continue
+            by_id.setdefault(row["id"], row)
+            successful += 1
 
     # Clean up test directory
     test_dir = output_dir / "3d-fox-test"
@@ -317,8 +493,8 @@ def main():
         shutil.rmtree(str(test_dir), ignore_errors=True)
 
     # Save manifest
-    with open(manifest_path, "w") as f:
-        json.dump(manifest, f, indent=2)
+    manifest["characters"] = list(by_id.values())
+    write_manifest(manifest_path, manifest)
 
     print(f"\n=== Done! ===")
     print(f"Rendered: {successful}/{total} 3D characters")
@@ -9,12 +9,28 @@ Requires: PIXABAY_API_KEY environment variable (get free key at https://pixabay.
 If no API key, uses curated URLs from Pixabay's CC0-licensed images.
 """
 
-import json
+import importlib.util
 import os
 import sys
+import threading
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+USER_AGENT = "FlowSmartly/1.0"
+DOWNLOAD_WORKERS = 8
+
+# Keep-alive session: one TLS handshake per pooled connection instead of per image
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    _SESSION = requests.Session()
+    _SESSION.headers.update({"User-Agent": USER_AGENT})
+    _SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=DOWNLOAD_WORKERS))
+except ImportError:
+    _SESSION = None
+
 # Curated list of free CC0 2D character images from Pixabay
 # These are all CC0/public domain licensed
 CURATED_CHARACTERS = [
@@ -108,7 +124,15 @@ CURATED_CHARACTERS = [
 def download_image(url: str, output_path: str) -> bool:
     """Download an image from URL."""
     try:
-        req = urllib.request.Request(url, headers={"User-Agent": "FlowSmartly/1.0"})
+        if _SESSION is not None:
+            with _SESSION.get(url, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                with open(output_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+            return True
+
+        req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
         with urllib.request.urlopen(req, timeout=30) as response:
             data = response.read()
             with open(output_path, "wb") as f:
@@ -119,6 +143,45 @@ def download_image(url: str, output_path: str) -> bool:
         return False
 
 
+def load_prepare_module(prepare_script: Path):
+    """Import prepare-character.py as a module (its filename is not a valid module name)."""
+    spec = importlib.util.spec_from_file_location("prepare_character", prepare_script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def process_character(char_info: dict, output_dir: Path, prepare, prepare_slots: threading.Semaphore) -> bool:
+    """Download and prepare one character. Returns True if it ends up in the library."""
+    char_id = char_info["id"]
+    char_dir = output_dir / char_id
+    char_dir.mkdir(parents=True, exist_ok=True)
+
+    if (char_dir / "texture.png").exists():
+        print(f"  [{char_id}] Already exists, skipping")
+        return True
+
+    # Download the image (network-bound, runs concurrently with other downloads)
+    raw_path = char_dir / "raw_download.png"
+    if not download_image(char_info["url"], str(raw_path)):
+        print(f"  [{char_id}] Skipping (download failed)")
+        return False
+
+    # Process in-process with prepare-character (CPU-bound, at most one per core);
+    # OpenCV releases the GIL while decoding/encoding, so the slots still overlap
+    try:
+        with prepare_slots:
+            prepare.prepare_character(str(raw_path), str(char_dir))
+    except Exception as e:
+        print(f"  [{char_id}] Processing failed: {e}")
+        return False
+
+    # Clean up raw download
+    raw_path.unlink(missing_ok=True)
+    print(f"  [{char_id}] Processed successfully")
+    return True
+
+
 def main():
     output_dir = Path(os.path.dirname(os.path.dirname(__file__))) / "public" / "characters"
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -128,43 +191,27 @@ def main():
     if not prepare_script.exists():
         print(f"Error: {prepare_script} not found")
         sys.exit(1)
+    # Imported once up front, not per character in a fresh interpreter
+    prepare = load_prepare_module(prepare_script)
 
     manifest = {
         "characters": [],
         "categories": ["boy", "girl", "man", "woman", "animal", "fantasy"],
     }
 
+    print(f"Processing {len(CURATED_CHARACTERS)} characters...")
+    prepare_slots = threading.Semaphore(os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+        results = list(pool.map(
+            lambda char_info: process_character(char_info, output_dir, prepare, prepare_slots),
+            CURATED_CHARACTERS,
+        ))
+
     successful = 0
-    for i, char_info in enumerate(CURATED_CHARACTERS, 1):
+    for char_info, ok in zip(CURATED_CHARACTERS, results):
+        if not ok:
+            continue
         char_id = char_info["id"]
-        char_dir = output_dir / char_id
-        print(f"[{i}/{len(CURATED_CHARACTERS)}] {char_info['name']} ({char_id})")
-
-        # Download the image
-        raw_path = char_dir / "raw_download.png"
-        char_dir.mkdir(parents=True, exist_ok=True)
-
-        if not (char_dir / "texture.png").exists():
-            if not download_image(char_info["url"], str(raw_path)):
-                print(f"  Skipping {char_id} (download failed)")
-                continue
-
-            # Process with prepare-character.py
-            import subprocess
-            result = subprocess.run(
-                [sys.executable, str(prepare_script), "--input", str(raw_path), "--output", str(char_dir)],
-                capture_output=True, text=True,
-            )
-            if result.returncode != 0:
-                print(f"  Processing failed: {result.stderr}")
-                continue
-
-            # Clean up raw download
-            raw_path.unlink(missing_ok=True)
-            print(f"  Processed successfully")
-        else:
-            print(f"  Already exists, skipping")
-
         manifest["characters"].append({
             "id": char_id,
             "name": char_info["name"],
@@ -178,8 +225,7 @@ def main():
 
     # Save manifest
     manifest_path = output_dir / "manifest.json"
-    with open(manifest_path, "w") as f:
-        json.dump(manifest, f, indent=2)
+    prepare.write_manifest(manifest_path, manifest)
 
     print(f"\nDone! {successful}/{len(CURATED_CHARACTERS)} characters processed")
     print(f"Manifest: {manifest_path}")
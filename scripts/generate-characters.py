@@ -4,25 +4,86 @@ Generate simple 2D cartoon character PNGs using Pillow.
 No external downloads needed — creates characters programmatically.
 
 Each character: full-body, front-facing, transparent background, ~600x800px RGBA PNG.
-Then runs prepare-character.py to create mask, skeleton, and thumbnail.
+Then hands it to prepare-character.py (in-process) to create mask, skeleton, and thumbnail.
+
+If Pillow is missing it is bootstrapped as Pillow-SIMD on x86-64 (faster encode/resize
+paths, same API), and as stock Pillow on ARM/Apple Silicon or if the SIMD build fails.
+An existing Pillow install is left alone: Pillow-SIMD replaces it, so swap manually
+with `pip uninstall pillow && pip install pillow-simd` if you want it.
 
 Usage:
     python scripts/generate-characters.py
 """
 
+import hashlib
+import importlib.util
 import json
+import multiprocessing
 import os
+import platform
+import shutil
 import subprocess
 import sys
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache, partial
 from pathlib import Path
 
 try:
     from PIL import Image, ImageDraw
 except ImportError:
-    print("Installing Pillow...")
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "Pillow"])
+    # Pillow-SIMD is a drop-in fork with SSE4/AVX2 resize/composite paths; it only
+    # builds on x86, and needs a compiler, so fall back to stock Pillow otherwise
+    installed = False
+    if platform.machine() in ("x86_64", "AMD64"):
+        print("Installing Pillow-SIMD...")
+        installed = subprocess.call([sys.executable, "-m", "pip", "install", "pillow-simd"]) == 0
+    if not installed:
+        print("Installing Pillow...")
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "Pillow"])
     from PIL import Image, ImageDraw
 
+import numpy as np
+
+# Opt-in: numba's import/JIT-cache load (~1 s per process) outweighs the per-shape
+# savings for the stock 31-character batch; worth it for much larger batches
+njit = None
+if os.environ.get("USE_NUMBA", "0") == "1":
+    try:
+        from numba import njit
+    except ImportError:  # plain NumPy masked writes are used instead
+        pass
+
+# Opt-in (FAST_RENDER=1): rasterize with Skia's anti-aliased vector primitives instead of
+# the NumPy canvas. Output has smooth edges, so it is not pixel-identical to the default
+skia = None
+if os.environ.get("FAST_RENDER", "0") not in ("", "0"):
+    try:
+        import skia
+    except ImportError:
+        print("FAST_RENDER set but skia-python is not installed (pip install skia-python); using NumPy canvas")
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Finished character directories keyed by a hash of their definition, so re-running after
+# tweaking CHARACTERS (or wiping public/characters) only redraws what changed.
+# Bump RENDER_CACHE_VERSION whenever the drawing code changes.
+RENDER_CACHE_DIR = SCRIPT_DIR / ".cache" / "characters"
+RENDER_CACHE_VERSION = 1
+CHARACTER_FILES = ("texture.png", "mask.png", "char_cfg.yaml", "thumbnail.png")
+
+# Draft mode: draw the flat 2D styles (humanoid/animal/robot) at 1/N resolution and
+# nearest-neighbour upscale, ~N^2 fewer pixels touched. The 3D styles always render at
+# full size. Output is blockier, so this is opt-in (e.g. CHARACTER_RENDER_SCALE=2).
+RENDER_SCALE = max(1, int(os.environ.get("CHARACTER_RENDER_SCALE", "1")))
+
+# Release mode (CHAR_GEN_RELEASE=1) for the PNGs that get committed: max zlib effort,
+# ~20% smaller textures for ~5x the encode time. Same pixels either way.
+RELEASE_PNG = os.environ.get("CHAR_GEN_RELEASE", "0") == "1"
+PNG_COMPRESS_LEVEL = 9 if RELEASE_PNG else 6
+
 
 # Character definitions
 CHARACTERS = [
@@ -304,33 +365,541 @@ CHARACTERS = [
 ]
 
 
+# Shared, character-independent colors
+WHITE = (255, 255, 255, 255)
+NEAR_BLACK = (30, 30, 30, 255)
+OUTLINE = (40, 40, 40, 255)
+OUTLINE_3D = NEAR_BLACK
+PUPIL_3D = (20, 20, 20, 255)
+SHOE = (60, 60, 60, 255)
+GLASSES_FRAME = (60, 60, 60, 255)
+CAPE_RED = (180, 0, 0, 255)
+WING = (200, 180, 255, 150)
+WING_OUTLINE = (180, 160, 235, 200)
+STAR_GOLD = (255, 215, 0, 255)
+ORANGE = (255, 165, 0, 255)
+ROBOT_LIMB = (140, 140, 150, 255)
+ROBOT_SCREEN = (20, 20, 30, 255)
+
+# Repeated triangles as (n, 3, 2) vertex arrays relative to the head centre (the mouth for
+# the monster's teeth, the body centre line for the dino), offset in one add at draw time
+SPIKY_HAIR = np.array([[(dx - 12, -60), (dx + 12, -60), (dx, -100)] for dx in range(-50, 60, 20)])
+SPIKY_HAIR_3D = np.array([[(dx - 14, -65), (dx + 14, -65), (dx, -110)] for dx in range(-55, 65, 18)])
+DINO_TAIL_SPINES = np.array([[(tx, 380), (tx + 15, 380), (tx + 8, 355)] for tx in range(80, 180, 30)])
+DINO_HEAD_SPINES = np.array([[(sx, sy), (sx + 20, sy), (sx + 10, sy - 30)] for sx, sy in [(-15, 65), (5, 55), (25, 65)]])
+MONSTER_TEETH = np.array([[(tx, -5), (tx + 10, -5), (tx + 5, 10)] for tx in range(-35, 40, 18)])
+
+
+@lru_cache(maxsize=256)
 def hex_to_rgb(hex_color: str):
-    h = hex_color.lstrip("#")
-    return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
+    # One int parse; iterating the 3 big-endian bytes yields (r, g, b)
+    return tuple(int(hex_color.lstrip("#"), 16).to_bytes(3, "big"))
 
 
+@lru_cache(maxsize=256)
 def darken(color_hex: str, factor: float = 0.7):
     r, g, b = hex_to_rgb(color_hex)
     return (int(r * factor), int(g * factor), int(b * factor), 255)
 
 
+@lru_cache(maxsize=256)
+def lighten(color_hex: str, factor: float = 1.3):
+    r, g, b = hex_to_rgb(color_hex)
+    return (min(255, int(r * factor)), min(255, int(g * factor)), min(255, int(b * factor)), 255)
+
+
+# Hex color fields a character may define, with the default used when it is absent
+COLOR_FIELDS = {
+    "skin": None, "hair": "#333333", "shirt": None, "pants": None,
+    "body_color": None, "belly_color": None, "accent_color": None,
+}
+
+
+def precompute_colors(char: dict) -> dict:
+    """
+    Attach parsed RGBA tuples as `_<field>_rgba` keys so draw_* index them directly.
+
+    Run once per character at import; the draw functions expect these keys. Underscore
+    keys are derived data and are left out of the render-cache hash.
+    """
+    for field, default in COLOR_FIELDS.items():
+        value = char.get(field, default)
+        if value is not None:
+            char[f"_{field}_rgba"] = hex_to_rgb(value) + (255,)
+    return char
+
+
+for _char in CHARACTERS:
+    precompute_colors(_char)
+
+
+@lru_cache(maxsize=None)
+def _packed(color: tuple) -> np.uint32:
+    """RGBA tuple as the native-endian uint32 the canvas stores per pixel."""
+    return np.array(color, dtype=np.uint8).view(np.uint32)[0]
+
+
+def _frozen(mask: np.ndarray) -> np.ndarray:
+    mask.setflags(write=False)
+    return mask
+
+
+def _box_coords(x0: int, y0: int, x1: int, y1: int):
+    """Bounding-box coordinate vectors (unclipped; the box may leave the canvas)."""
+    return np.arange(y0, y1 + 1)[:, None], np.arange(x0, x1 + 1)[None, :]
+
+
+@lru_cache(maxsize=1024)
+def _ellipse_mask(x0: int, y0: int, x1: int, y1: int, inset: int = 0) -> np.ndarray:
+    ys, xs = _box_coords(x0, y0, x1, y1)
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    rx, ry = (x1 - x0) / 2 + 0.5 - inset, (y1 - y0) / 2 + 0.5 - inset
+    if rx <= 0 or ry <= 0:
+        return _frozen(np.zeros((y1 - y0 + 1, x1 - x0 + 1), dtype=bool))
+    return _frozen(((xs - cx) / rx) ** 2 + ((ys - cy) / ry) ** 2 <= 1)
+
+
+@lru_cache(maxsize=1024)
+def _rounded_mask(x0: int, y0: int, x1: int, y1: int, radius: int, inset: int = 0) -> np.ndarray:
+    ys, xs = _box_coords(x0, y0, x1, y1)
+    ix0, iy0, ix1, iy1 = x0 + inset, y0 + inset, x1 - inset, y1 - inset
+    r = max(radius - inset, 0)
+    # Distance past the inner (corner-centre) rectangle; inside iff it fits in the corner radius
+    dx = np.maximum(np.maximum(ix0 + r - xs, xs - (ix1 - r)), 0)
+    dy = np.maximum(np.maximum(iy0 + r - ys, ys - (iy1 - r)), 0)
+    inside = (xs >= ix0) & (xs <= ix1) & (ys >= iy0) & (ys <= iy1)
+    if r:
+        inside &= dx * dx + dy * dy <= (r + 0.5) ** 2
+    return _frozen(inside)
+
+
+@lru_cache(maxsize=256)
+def _ellipses_mask(boxes: tuple):
+    """Union of several filled ellipses as one mask over their combined bounding box."""
+    b = np.array(boxes, dtype=np.float64)
+    x0, y0 = int(b[:, 0].min()), int(b[:, 1].min())
+    x1, y1 = int(b[:, 2].max()), int(b[:, 3].max())
+    ys, xs = _box_coords(x0, y0, x1, y1)
+    cx = ((b[:, 0] + b[:, 2]) / 2)[:, None, None]
+    cy = ((b[:, 1] + b[:, 3]) / 2)[:, None, None]
+    rx = ((b[:, 2] - b[:, 0]) / 2 + 0.5)[:, None, None]
+    ry = ((b[:, 3] - b[:, 1]) / 2 + 0.5)[:, None, None]
+    inside = ((xs - cx) / rx) ** 2 + ((ys - cy) / ry) ** 2 <= 1
+    return _frozen(inside.any(axis=0)), x0, y0
+
+
+@lru_cache(maxsize=1024)
+def _shape_masks(kind: str, xy: tuple, radius: int, width: int):
+    """
+    (outer, inner, ring) masks for an outlined shape, cached by geometry.
+
+    Characters share most of their geometry (heads, limbs, eyes, shoes) and only differ in
+    color, so after the first character of each type nearly every primitive is a cache hit.
+    """
+    if kind == "ellipse":
+        outer, inner = _ellipse_mask(*xy), _ellipse_mask(*xy, width)
+    elif kind == "rounded":
+        outer, inner = _rounded_mask(*xy, radius), _rounded_mask(*xy, radius, width)
+    else:
+        x0, y0, x1, y1 = xy
+        outer = np.ones((y1 - y0 + 1, x1 - x0 + 1), dtype=bool)
+        inner = np.zeros_like(outer)
+        inner[width:-width or None, width:-width or None] = True
+    return _frozen(outer), _frozen(inner), _frozen(outer & ~inner)
+
+
+@lru_cache(maxsize=256)
+def _pillow_labels(kind: str, points: tuple, pad: int, args: tuple):
+    """Rasterize a Pillow-only primitive into a bbox-sized label image (1=fill, 2=outline)."""
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    x0, y0 = int(min(xs)) - pad, int(min(ys)) - pad
+    x1, y1 = int(max(xs)) + pad, int(max(ys)) + pad
+    labels = Image.new("L", (x1 - x0 + 1, y1 - y0 + 1), 0)
+    local = [(x - x0, y - y0) for x, y in points]
+    d = ImageDraw.Draw(labels)
+    if kind == "polygon":
+        has_fill, has_outline, width = args
+        d.polygon(local, fill=1 if has_fill else None, outline=2 if has_outline else None, width=width)
+    elif kind == "line":
+        d.line(local, fill=1, width=args[0])
+    else:
+        start, end, width = args
+        d.arc([*local[0], *local[1]], start, end, fill=1, width=width)
+    labels = np.asarray(labels)
+    return _frozen(labels == 1), _frozen(labels == 2), x0, y0
+
+
+if njit is not None:
+    @njit(cache=True, nogil=True)
+    def _paint_kernel(px, mask, value):
+        """Single pass over the mask's bounding box writing one packed RGBA value."""
+        height, width = mask.shape
+        for y in range(height):
+            row = mask[y]
+            out = px[y]
+            for x in range(width):
+                if row[x]:
+                    out[x] = value
+
+    # Compile up front (contiguous and clipped-slice mask layouts) so the first
+    # character doesn't pay for it mid-render
+    _warm_px = np.zeros((4, 4), dtype=np.uint32)
+    _warm_mask = np.ones((4, 4), dtype=bool)
+    _paint_kernel(_warm_px[:2, :2], _warm_mask, np.uint32(0))
+    _paint_kernel(_warm_px[:2, :2], _warm_mask[:2, :2], np.uint32(0))
+    del _warm_px, _warm_mask
+else:
+    _paint_kernel = None
+
+
+_canvas_pool = threading.local()
+
+
+def _pooled_buffer(width: int, height: int) -> np.ndarray:
+    """Zeroed RGBA buffer reused across canvases of the same size on this thread."""
+    pool = _canvas_pool.__dict__
+    buf = pool.get((width, height))
+    if buf is None:
+        buf = pool[(width, height)] = np.zeros((height, width, 4), dtype=np.uint8)
+    else:
+        buf.fill(0)
+    return buf
+
+
+@lru_cache(maxsize=256)
+def _polygons_mask(polygons: tuple, outline_width: int = 0):
+    """
+    Several polygons rasterized in one Pillow label image (1=fill, 2=outline).
+
+    Each polygon is drawn over the previous ones, fill then outline, so the masks match
+    drawing them one at a time in order.
+    """
+    pad = outline_width
+    xs = [x for poly in polygons for x, _ in poly]
+    ys = [y for poly in polygons for _, y in poly]
+    x0, y0 = min(xs) - pad, min(ys) - pad
+    labels = Image.new("L", (max(xs) + pad - x0 + 1, max(ys) + pad - y0 + 1), 0)
+    d = ImageDraw.Draw(labels)
+    for poly in polygons:
+        d.polygon([(x - x0, y - y0) for x, y in poly], fill=1,
+                  outline=2 if outline_width else None, width=outline_width or 1)
+    labels = np.asarray(labels)
+    return _frozen(labels == 1), _frozen(labels == 2), x0, y0
+
+
+class Canvas:
+    """
+    NumPy-backed RGBA canvas with the subset of the ImageDraw API the draw_* functions use.
+
+    Ellipses, rectangles and rounded rectangles are rasterized as boolean masks over their
+    bounding box, so each primitive is a couple of vectorized NumPy ops instead of a round
+    trip through ImageDraw. Polygons, lines and arcs are rare and go through Pillow on a small
+    label image covering just their bounding box. Like ImageDraw on an RGBA image, colors are
+    written as-is (alpha included), not blended.
+
+    The pixel buffer is pooled per thread, so batch renders don't allocate a fresh ~2 MB
+    canvas per character. The image returned by image() shares that buffer: consume or copy
+    it before creating the next canvas of the same size on the same thread.
+
+    With scale > 1 the caller keeps drawing in full-size coordinates, but everything is
+    rasterized at 1/scale resolution and image() upsamples with nearest-neighbour.
+    """
+
+    def __init__(self, width: int, height: int, scale: int = 1):
+        self.out_size = (width, height)
+        self.scale = scale
+        self.width = -(-width // scale)
+        self.height = -(-height // scale)
+        self.buf = _pooled_buffer(self.width, self.height)
+        # One uint32 per pixel, so a masked write moves whole RGBA pixels at once
+        self.px = self.buf.view(np.uint32)[..., 0]
+
+    def image(self) -> Image.Image:
+        img = Image.frombuffer("RGBA", (self.width, self.height), self.buf, "raw", "RGBA", 0, 1)
+        if self.scale == 1:
+            return img
+        img = img.resize((self.width * self.scale, self.height * self.scale), Image.Resampling.NEAREST)
+        return img.crop((0, 0, *self.out_size)) if img.size != self.out_size else img
+
+    def _xy(self, xy) -> tuple:
+        """Flat bbox or point list in full-size coordinates -> canvas coordinates (hashable)."""
+        s = self.scale
+        if isinstance(xy[0], (tuple, list)):
+            return tuple((x // s, y // s) for x, y in xy)
+        return tuple(v // s for v in xy)
+
+    def _len(self, v: int) -> int:
+        return max(1, v // self.scale) if v else 0
+
+    def _paint(self, x0: int, y0: int, mask: np.ndarray, color) -> None:
+        """Write `color` wherever `mask` (anchored at x0, y0) is set, clipped to the canvas."""
+        h, w = mask.shape
+        cx0, cy0 = max(x0, 0), max(y0, 0)
+        cx1, cy1 = min(x0 + w, self.width), min(y0 + h, self.height)
+        if cx0 >= cx1 or cy0 >= cy1:
+            return
+        m = mask[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+        if _paint_kernel is not None:
+            _paint_kernel(self.px[cy0:cy1, cx0:cx1], m, _packed(color))
+        else:
+            np.copyto(self.px[cy0:cy1, cx0:cx1], _packed(color), where=m)
+
+    def stamp(self, builder, cx: int, cy: int) -> None:
+        """Blit the cached stamp of an eye-pair builder, rendered at this canvas's scale, centred on (cx, cy)."""
+        pixels, mask = _eye_stamp(builder, self.scale)
+        h, w = mask.shape
+        x0, y0 = cx // self.scale - w // 2, cy // self.scale - h // 2
+        cx0, cy0 = max(x0, 0), max(y0, 0)
+        cx1, cy1 = min(x0 + w, self.width), min(y0 + h, self.height)
+        if cx0 >= cx1 or cy0 >= cy1:
+            return
+        src = (slice(cy0 - y0, cy1 - y0), slice(cx0 - x0, cx1 - x0))
+        np.copyto(self.px[cy0:cy1, cx0:cx1], pixels[src], where=mask[src])
+
+    def _shape(self, kind: str, xy, radius: int, fill, outline, width: int) -> None:
+        xy = self._xy(xy)
+        radius = radius // self.scale
+        if outline is None:
+            if fill is not None:
+                mask = _ellipse_mask(*xy) if kind == "ellipse" else _rounded_mask(*xy, radius)
+                self._paint(xy[0], xy[1], mask, fill)
+            return
+        _, inner, ring = _shape_masks(kind, xy, radius, self._len(width))
+        if fill is not None:
+            self._paint(xy[0], xy[1], inner, fill)
+        self._paint(xy[0], xy[1], ring, outline)
+
+    def ellipse(self, xy, fill=None, outline=None, width: int = 1) -> None:
+        self._shape("ellipse", xy, 0, fill, outline, width)
+
+    def ellipses(self, boxes, fill) -> None:
+        """Fill several same-colored ellipses with one masked write."""
+        mask, x0, y0 = _ellipses_mask(tuple(self._xy(box) for box in boxes))
+        self._paint(x0, y0, mask, fill)
+
+    def rectangle(self, xy, fill=None, outline=None, width: int = 1) -> None:
+        if outline is None:
+            if fill is not None:
+                x0, y0, x1, y1 = self._xy(xy)
+                self.px[max(y0, 0):max(y1 + 1, 0), max(x0, 0):max(x1 + 1, 0)] = _packed(fill)
+            return
+        self._shape("rectangle", xy, 0, fill, outline, width)
+
+    def rounded_rectangle(self, xy, radius: int = 0, fill=None, outline=None, width: int = 1) -> None:
+        self._shape("rounded", xy, radius, fill, outline, width)
+
+    def polygon(self, xy, fill=None, outline=None, width: int = 1) -> None:
+        width = self._len(width)
+        fill_mask, outline_mask, x0, y0 = _pillow_labels(
+            "polygon", self._xy(xy), width, (fill is not None, outline is not None, width))
+        if fill is not None:
+            self._paint(x0, y0, fill_mask, fill)
+        if outline is not None:
+            self._paint(x0, y0, outline_mask, outline)
+
+    def polygons(self, polygons, fill, outline=None, width: int = 1) -> None:
+        """Draw several same-colored polygons (e.g. an (n, k, 2) vertex array) with one masked write per color."""
+        s = self.scale
+        key = tuple(tuple((int(x) // s, int(y) // s) for x, y in poly) for poly in polygons)
+        fill_mask, outline_mask, x0, y0 = _polygons_mask(key, self._len(width) if outline is not None else 0)
+        self._paint(x0, y0, fill_mask, fill)
+        if outline is not None:
+            self._paint(x0, y0, outline_mask, outline)
+
+    def line(self, xy, fill=None, width: int = 1) -> None:
+        width = self._len(width)
+        mask, _, x0, y0 = _pillow_labels("line", self._xy(xy), width, (width,))
+        self._paint(x0, y0, mask, fill)
+
+    def arc(self, xy, start: float, end: float, fill=None, width: int = 1) -> None:
+        x0, y0, x1, y1 = self._xy(xy)
+        mask, _, lx, ly = _pillow_labels("arc", ((x0, y0), (x1, y1)), 0, (start, end, self._len(width)))
+        self._paint(lx, ly, mask, fill)
+
+
+class SkiaCanvas:
+    """
+    Skia-backed drop-in for Canvas, used when FAST_RENDER is set.
+
+    Shapes are drawn as anti-aliased ovals, rounded rects and paths. Paints use the Src blend
+    mode so colors (alpha included) replace what is underneath like ImageDraw does, blended
+    only by edge coverage. Outlines are stroked inside the bounding box, as Pillow draws them.
+    Eye pairs are drawn directly rather than stamped. `scale` is accepted for signature
+    compatibility but ignored: Skia always renders at full size.
+    """
+
+    def __init__(self, width: int, height: int, scale: int = 1):
+        self.scale = 1
+        self.surface = skia.Surface(width, height)
+        self.canvas = self.surface.getCanvas()
+        self.canvas.clear(skia.ColorTRANSPARENT)
+
+    def image(self) -> Image.Image:
+        pixels = self.surface.makeImageSnapshot().toarray(
+            colorType=skia.kRGBA_8888_ColorType, alphaType=skia.kUnpremul_AlphaType)
+        return Image.fromarray(pixels, "RGBA")
+
+    @staticmethod
+    def _paint(color, width: float = 0) -> "skia.Paint":
+        r, g, b, *a = color
+        return skia.Paint(
+            Color=skia.Color(r, g, b, a[0] if a else 255),
+            AntiAlias=True,
+            BlendMode=skia.BlendMode.kSrc,
+            Style=skia.Paint.kStroke_Style if width else skia.Paint.kFill_Style,
+            StrokeWidth=width,
+        )
+
+    @staticmethod
+    def _rect(xy, inset: float = 0) -> "skia.Rect":
+        """Pillow bbox (inclusive pixel corners) -> Skia rect covering those pixels."""
+        x0, y0, x1, y1 = xy
+        return skia.Rect.MakeLTRB(x0 + inset, y0 + inset, x1 + 1 - inset, y1 + 1 - inset)
+
+    def _shape(self, draw, xy, fill, outline, width: int) -> None:
+        if fill is not None:
+            draw(self._rect(xy), self._paint(fill))
+        if outline is not None and width:
+            draw(self._rect(xy, width / 2), self._paint(outline, width))
+
+    def stamp(self, builder, cx: int, cy: int) -> None:
+        builder(self, cx, cy)
+
+    def ellipse(self, xy, fill=None, outline=None, width: int = 1) -> None:
+        self._shape(self.canvas.drawOval, xy, fill, outline, width)
+
+    def ellipses(self, boxes, fill) -> None:
+        path = skia.Path()
+        for box in boxes:
+            path.addOval(self._rect(box))
+        self.canvas.drawPath(path, self._paint(fill))
+
+    def rectangle(self, xy, fill=None, outline=None, width: int = 1) -> None:
+        self._shape(self.canvas.drawRect, xy, fill, outline, width)
+
+    def rounded_rectangle(self, xy, radius: int = 0, fill=None, outline=None, width: int = 1) -> None:
+        def draw(rect, paint):
+            self.canvas.drawRoundRect(rect, radius, radius, paint)
+        self._shape(draw, xy, fill, outline, width)
+
+    @staticmethod
+    def _path(points, close: bool = True) -> "skia.Path":
+        path = skia.Path()
+        path.addPoly([skia.Point(float(x) + 0.5, float(y) + 0.5) for x, y in points], close)
+        return path
+
+    def polygon(self, xy, fill=None, outline=None, width: int = 1) -> None:
+        path = self._path(xy)
+        if fill is not None:
+            self.canvas.drawPath(path, self._paint(fill))
+        if outline is not None and width:
+            self.canvas.drawPath(path, self._paint(outline, width))
+
+    def polygons(self, polygons, fill, outline=None, width: int = 1) -> None:
+        if outline is not None:
+            # Keep each polygon's outline over the previous ones, as when drawn in turn
+            for poly in polygons:
+                self.polygon(poly, fill=fill, outline=outline, width=width)
+            return
+        path = skia.Path()
+        for poly in polygons:
+            path.addPath(self._path(poly))
+        self.canvas.drawPath(path, self._paint(fill))
+
+    def line(self, xy, fill=None, width: int = 1) -> None:
+        self.canvas.drawPath(self._path(xy, close=False), self._paint(fill, width))
+
+    def arc(self, xy, start: float, end: float, fill=None, width: int = 1) -> None:
+        # Both Pillow and Skia measure degrees clockwise from 3 o'clock
+        self.canvas.drawArc(self._rect(xy, width / 2), start, end - start, False, self._paint(fill, width))
+
+
+def _new_canvas(width: int, height: int, scale: int = 1):
+    return SkiaCanvas(width, height) if skia is not None else Canvas(width, height, scale)
+
+
+# --- Eye pairs ---
+# Eyes are identical for every character of a type, so each pair is drawn once into a
+# small stamp and blitted per character. Builders draw around (cx, eye_y).
+
+def _humanoid_eyes(d, cx: int, eye_y: int) -> None:
+    eye_offset = 25
+    # White
+    d.ellipse([cx - eye_offset - 15, eye_y - 12, cx - eye_offset + 15, eye_y + 12], fill=WHITE)
+    d.ellipse([cx + eye_offset - 15, eye_y - 12, cx + eye_offset + 15, eye_y + 12], fill=WHITE)
+    # Pupil
+    d.ellipse([cx - eye_offset - 7, eye_y - 7, cx - eye_offset + 7, eye_y + 7], fill=NEAR_BLACK)
+    d.ellipse([cx + eye_offset - 7, eye_y - 7, cx + eye_offset + 7, eye_y + 7], fill=NEAR_BLACK)
+    # Shine
+    d.ellipse([cx - eye_offset - 2, eye_y - 6, cx - eye_offset + 4, eye_y - 1], fill=WHITE)
+    d.ellipse([cx + eye_offset - 2, eye_y - 6, cx + eye_offset + 4, eye_y - 1], fill=WHITE)
+
+
+def _animal_eyes(d, cx: int, eye_y: int) -> None:
+    eye_offset = 30
+    outline = OUTLINE
+    # White
+    d.ellipse([cx - eye_offset - 12, eye_y - 12, cx - eye_offset + 12, eye_y + 12],
+              fill=WHITE, outline=outline, width=2)
+    d.ellipse([cx + eye_offset - 12, eye_y - 12, cx + eye_offset + 12, eye_y + 12],
+              fill=WHITE, outline=outline, width=2)
+    d.ellipse([cx - eye_offset - 6, eye_y - 6, cx - eye_offset + 6, eye_y + 6], fill=NEAR_BLACK)
+    d.ellipse([cx + eye_offset - 6, eye_y - 6, cx + eye_offset + 6, eye_y + 6], fill=NEAR_BLACK)
+    # Shine
+    d.ellipse([cx - eye_offset - 1, eye_y - 5, cx - eye_offset + 4, eye_y - 1], fill=WHITE)
+    d.ellipse([cx + eye_offset - 1, eye_y - 5, cx + eye_offset + 4, eye_y - 1], fill=WHITE)
+
+
+def _3d_eyes(d, cx: int, eye_y: int) -> None:
+    eye_offset = 28
+    outline = OUTLINE_3D
+    # White (bigger)
+    d.ellipse([cx - eye_offset - 20, eye_y - 18, cx - eye_offset + 20, eye_y + 18], fill=WHITE, outline=outline, width=1)
+    d.ellipse([cx + eye_offset - 20, eye_y - 18, cx + eye_offset + 20, eye_y + 18], fill=WHITE, outline=outline, width=1)
+    # Iris (colored)
+    iris_color = (80, 140, 200, 255)
+    d.ellipse([cx - eye_offset - 10, eye_y - 10, cx - eye_offset + 10, eye_y + 10], fill=iris_color)
+    d.ellipse([cx + eye_offset - 10, eye_y - 10, cx + eye_offset + 10, eye_y + 10], fill=iris_color)
+    # Pupil
+    d.ellipse([cx - eye_offset - 5, eye_y - 5, cx - eye_offset + 5, eye_y + 5], fill=PUPIL_3D)
+    d.ellipse([cx + eye_offset - 5, eye_y - 5, cx + eye_offset + 5, eye_y + 5], fill=PUPIL_3D)
+    # Big shine
+    d.ellipse([cx - eye_offset + 2, eye_y - 12, cx - eye_offset + 12, eye_y - 4], fill=WHITE)
+    d.ellipse([cx + eye_offset + 2, eye_y - 12, cx + eye_offset + 12, eye_y - 4], fill=WHITE)
+    # Small shine
+    d.ellipse([cx - eye_offset - 6, eye_y + 2, cx - eye_offset - 1, eye_y + 6], fill=(255, 255, 255, 200))
+    d.ellipse([cx + eye_offset - 6, eye_y + 2, cx + eye_offset - 1, eye_y + 6], fill=(255, 255, 255, 200))
+
+
+@lru_cache(maxsize=None)
+def _eye_stamp(builder, scale: int = 1, half_width: int = 50, half_height: int = 20):
+    """Render an eye-pair builder once into a (packed pixels, mask) stamp centred on the eyes."""
+    stamp = Canvas(2 * half_width + 1, 2 * half_height + 1, scale)
+    builder(stamp, half_width, half_height)
+    return _frozen(stamp.px.copy()), _frozen(stamp.buf[..., 3] > 0)
+
+
 def draw_humanoid(char: dict, width: int = 600, height: int = 800) -> Image.Image:
     """Draw a simple cartoon humanoid character."""
-    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    d = ImageDraw.Draw(img)
-
-    skin = hex_to_rgb(char["skin"]) + (255,)
-    hair_color = hex_to_rgb(char.get("hair", "#333333")) + (255,)
-    shirt_color = hex_to_rgb(char["shirt"]) + (255,)
-    pants_color = hex_to_rgb(char["pants"]) + (255,)
-    shoe_color = (60, 60, 60, 255)
-    outline = (40, 40, 40, 255)
+    d = _new_canvas(width, height, RENDER_SCALE)
+
+    skin = char["_skin_rgba"]
+    hair_color = char["_hair_rgba"]
+    shirt_color = char["_shirt_rgba"]
+    pants_color = char["_pants_rgba"]
+    skin_shadow = darken(char["skin"], 0.85)
+    skin_dark = darken(char["skin"], 0.8)
+    shirt_dark = darken(char["shirt"], 0.8)
+    hat = char.get("hat")
+    shoe_color = SHOE
+    outline = OUTLINE
 
     cx = width // 2  # Center x
 
     # --- Cape (behind body) ---
     if char.get("cape"):
-        cape_color = (180, 0, 0, 255)
+        cape_color = CAPE_RED
         d.polygon([
             (cx - 80, 200), (cx + 80, 200),
             (cx + 100, 620), (cx - 100, 620),
@@ -353,11 +922,10 @@ def draw_humanoid(char: dict, width: int = 600, height: int = 800) -> Image.Imag
     body_top = 230
     body_bottom = 500
     if char.get("armor"):
-        armor_color = hex_to_rgb(char["shirt"]) + (255,)
-        d.rounded_rectangle([cx - 85, body_top, cx + 85, body_bottom], radius=15, fill=armor_color, outline=outline, width=3)
+        d.rounded_rectangle([cx - 85, body_top, cx + 85, body_bottom], radius=15, fill=shirt_color, outline=outline, width=3)
         # Armor details
-        d.line([(cx, body_top + 20), (cx, body_bottom - 20)], fill=darken(char["shirt"], 0.8), width=3)
-        d.line([(cx - 60, body_top + 80), (cx + 60, body_top + 80)], fill=darken(char["shirt"], 0.8), width=3)
+        d.line([(cx, body_top + 20), (cx, body_bottom - 20)], fill=shirt_dark, width=3)
+        d.line([(cx - 60, body_top + 80), (cx + 60, body_top + 80)], fill=shirt_dark, width=3)
     else:
         d.rounded_rectangle([cx - 85, body_top, cx + 85, body_bottom], radius=15, fill=shirt_color, outline=outline, width=2)
 
@@ -385,12 +953,7 @@ def draw_humanoid(char: dict, width: int = 600, height: int = 800) -> Image.Imag
     # --- Hair ---
     hs = char.get("hair_style", "neat")
     if hs == "spiky":
-        for dx in range(-50, 60, 20):
-            d.polygon([
-                (head_cx + dx - 12, head_cy - 60),
-                (head_cx + dx + 12, head_cy - 60),
-                (head_cx + dx, head_cy - 100),
-            ], fill=hair_color)
+        d.polygons(SPIKY_HAIR + (head_cx, head_cy), fill=hair_color)
         d.ellipse([head_cx - 70, head_cy - 80, head_cx + 70, head_cy - 30], fill=hair_color)
     elif hs == "long":
         d.ellipse([head_cx - 75, head_cy - 85, head_cx + 75, head_cy - 20], fill=hair_color)
@@ -426,21 +989,13 @@ def draw_humanoid(char: dict, width: int = 600, height: int = 800) -> Image.Imag
     # --- Eyes ---
     eye_y = head_cy - 5
     eye_offset = 25
-    # White
-    d.ellipse([head_cx - eye_offset - 15, eye_y - 12, head_cx - eye_offset + 15, eye_y + 12], fill=(255, 255, 255, 255))
-    d.ellipse([head_cx + eye_offset - 15, eye_y - 12, head_cx + eye_offset + 15, eye_y + 12], fill=(255, 255, 255, 255))
-    # Pupil
-    d.ellipse([head_cx - eye_offset - 7, eye_y - 7, head_cx - eye_offset + 7, eye_y + 7], fill=(30, 30, 30, 255))
-    d.ellipse([head_cx + eye_offset - 7, eye_y - 7, head_cx + eye_offset + 7, eye_y + 7], fill=(30, 30, 30, 255))
-    # Shine
-    d.ellipse([head_cx - eye_offset - 2, eye_y - 6, head_cx - eye_offset + 4, eye_y - 1], fill=(255, 255, 255, 255))
-    d.ellipse([head_cx + eye_offset - 2, eye_y - 6, head_cx + eye_offset + 4, eye_y - 1], fill=(255, 255, 255, 255))
+    d.stamp(_humanoid_eyes, head_cx, eye_y)
 
     # --- Glasses ---
     if char.get("glasses"):
-        d.ellipse([head_cx - eye_offset - 20, eye_y - 17, head_cx - eye_offset + 20, eye_y + 17], outline=(60, 60, 60, 255), width=3)
-        d.ellipse([head_cx + eye_offset - 20, eye_y - 17, head_cx + eye_offset + 20, eye_y + 17], outline=(60, 60, 60, 255), width=3)
-        d.line([(head_cx - 5, eye_y), (head_cx + 5, eye_y)], fill=(60, 60, 60, 255), width=3)
+        d.ellipse([head_cx - eye_offset - 20, eye_y - 17, head_cx - eye_offset + 20, eye_y + 17], outline=GLASSES_FRAME, width=3)
+        d.ellipse([head_cx + eye_offset - 20, eye_y - 17, head_cx + eye_offset + 20, eye_y + 17], outline=GLASSES_FRAME, width=3)
+        d.line([(head_cx - 5, eye_y), (head_cx + 5, eye_y)], fill=GLASSES_FRAME, width=3)
 
     # --- Mouth ---
     mouth_y = head_cy + 30
@@ -448,49 +1003,50 @@ def draw_humanoid(char: dict, width: int = 600, height: int = 800) -> Image.Imag
 
     # --- Nose ---
     nose_y = head_cy + 12
-    d.ellipse([head_cx - 5, nose_y, head_cx + 5, nose_y + 8], fill=darken(char["skin"], 0.85))
+    d.ellipse([head_cx - 5, nose_y, head_cx + 5, nose_y + 8], fill=skin_shadow)
 
     # --- Hat ---
-    if char.get("hat") == "chef":
-        d.ellipse([head_cx - 60, head_cy - 140, head_cx + 60, head_cy - 50], fill=(255, 255, 255, 255), outline=outline, width=2)
-        d.rectangle([head_cx - 65, head_cy - 80, head_cx + 65, head_cy - 65], fill=(255, 255, 255, 255), outline=outline, width=2)
-    elif char.get("hat") == "wizard":
+    if hat == "chef":
+        d.ellipse([head_cx - 60, head_cy - 140, head_cx + 60, head_cy - 50], fill=WHITE, outline=outline, width=2)
+        d.rectangle([head_cx - 65, head_cy - 80, head_cx + 65, head_cy - 65], fill=WHITE, outline=outline, width=2)
+    elif hat == "wizard":
         d.polygon([
             (head_cx, head_cy - 180),
             (head_cx - 70, head_cy - 60),
             (head_cx + 70, head_cy - 60),
-        ], fill=hex_to_rgb(char["shirt"]) + (255,), outline=outline, width=2)
+        ], fill=shirt_color, outline=outline, width=2)
         # Stars on hat
-        star_color = (255, 215, 0, 255)
+        star_color = STAR_GOLD
         d.ellipse([head_cx - 10, head_cy - 130, head_cx + 10, head_cy - 110], fill=star_color)
         d.ellipse([head_cx + 15, head_cy - 100, head_cx + 30, head_cy - 85], fill=star_color)
 
     # --- Wings (fairy) ---
     if char.get("wings"):
-        wing_color = (200, 180, 255, 150)
+        wing_color = WING
         # Left wing
-        d.ellipse([cx - 170, 200, cx - 80, 380], fill=wing_color, outline=(180, 160, 235, 200), width=2)
+        d.ellipse([cx - 170, 200, cx - 80, 380], fill=wing_color, outline=WING_OUTLINE, width=2)
         # Right wing
-        d.ellipse([cx + 80, 200, cx + 170, 380], fill=wing_color, outline=(180, 160, 235, 200), width=2)
+        d.ellipse([cx + 80, 200, cx + 170, 380], fill=wing_color, outline=WING_OUTLINE, width=2)
 
     # --- Antenna (alien) ---
     if char.get("antenna"):
-        d.line([(head_cx - 20, head_cy - 75), (head_cx - 30, head_cy - 120)], fill=darken(char["skin"], 0.8), width=4)
-        d.line([(head_cx + 20, head_cy - 75), (head_cx + 30, head_cy - 120)], fill=darken(char["skin"], 0.8), width=4)
+        d.line([(head_cx - 20, head_cy - 75), (head_cx - 30, head_cy - 120)], fill=skin_dark, width=4)
+        d.line([(head_cx + 20, head_cy - 75), (head_cx + 30, head_cy - 120)], fill=skin_dark, width=4)
         d.ellipse([head_cx - 40, head_cy - 135, head_cx - 20, head_cy - 115], fill=(255, 200, 0, 255))
         d.ellipse([head_cx + 20, head_cy - 135, head_cx + 40, head_cy - 115], fill=(255, 200, 0, 255))
 
-    return img
+    return d.image()
 
 
 def draw_animal(char: dict, width: int = 600, height: int = 800) -> Image.Image:
     """Draw a simple cartoon animal character."""
-    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    d = ImageDraw.Draw(img)
+    d = _new_canvas(width, height, RENDER_SCALE)
 
-    body_color = hex_to_rgb(char["body_color"]) + (255,)
-    belly_color = hex_to_rgb(char["belly_color"]) + (255,)
-    outline = (40, 40, 40, 255)
+    body_color = char["_body_color_rgba"]
+    belly_color = char["_belly_color_rgba"]
+    ear_color = darken(char["body_color"], 0.8)
+    inner_ear_color = darken(char["body_color"], 0.7)
+    outline = OUTLINE
     cx = width // 2
     animal = char["animal_type"]
 
@@ -502,12 +1058,12 @@ def draw_animal(char: dict, width: int = 600, height: int = 800) -> Image.Image:
         # Head
         d.ellipse([cx - 80, 100, cx + 80, 280], fill=body_color, outline=outline, width=2)
         # Ears (floppy)
-        d.ellipse([cx - 100, 80, cx - 40, 200], fill=darken(char["body_color"], 0.8))
-        d.ellipse([cx + 40, 80, cx + 100, 200], fill=darken(char["body_color"], 0.8))
+        d.ellipse([cx - 100, 80, cx - 40, 200], fill=ear_color)
+        d.ellipse([cx + 40, 80, cx + 100, 200], fill=ear_color)
         # Snout
         d.ellipse([cx - 35, 190, cx + 35, 250], fill=belly_color, outline=outline, width=2)
         # Nose
-        d.ellipse([cx - 12, 195, cx + 12, 215], fill=(30, 30, 30, 255))
+        d.ellipse([cx - 12, 195, cx + 12, 215], fill=NEAR_BLACK)
         # Legs
         d.rounded_rectangle([cx - 70, 490, cx - 30, 680], radius=15, fill=body_color, outline=outline, width=2)
         d.rounded_rectangle([cx + 30, 490, cx + 70, 680], radius=15, fill=body_color, outline=outline, width=2)
@@ -552,13 +1108,13 @@ def draw_animal(char: dict, width: int = 600, height: int = 800) -> Image.Image:
         d.ellipse([cx - 90, 90, cx + 90, 290], fill=body_color, outline=outline, width=2)
         # Ears (round)
         d.ellipse([cx - 95, 70, cx - 45, 130], fill=body_color, outline=outline, width=2)
-        d.ellipse([cx - 80, 80, cx - 55, 118], fill=darken(char["body_color"], 0.7))
+        d.ellipse([cx - 80, 80, cx - 55, 118], fill=inner_ear_color)
         d.ellipse([cx + 45, 70, cx + 95, 130], fill=body_color, outline=outline, width=2)
-        d.ellipse([cx + 55, 80, cx + 80, 118], fill=darken(char["body_color"], 0.7))
+        d.ellipse([cx + 55, 80, cx + 80, 118], fill=inner_ear_color)
         # Snout
         d.ellipse([cx - 40, 185, cx + 40, 250], fill=belly_color, outline=outline, width=2)
         # Nose
-        d.ellipse([cx - 15, 195, cx + 15, 220], fill=(30, 30, 30, 255))
+        d.ellipse([cx - 15, 195, cx + 15, 220], fill=NEAR_BLACK)
         # Arms
         d.rounded_rectangle([cx - 140, 300, cx - 95, 480], radius=20, fill=body_color, outline=outline, width=2)
         d.rounded_rectangle([cx + 95, 300, cx + 140, 480], radius=20, fill=body_color, outline=outline, width=2)
@@ -577,13 +1133,13 @@ def draw_animal(char: dict, width: int = 600, height: int = 800) -> Image.Image:
         # Head
         d.ellipse([cx - 70, 80, cx + 70, 240], fill=body_color, outline=outline, width=2)
         # Beak
-        d.polygon([(cx, 175), (cx - 20, 200), (cx + 20, 200)], fill=(255, 165, 0, 255), outline=outline, width=2)
+        d.polygon([(cx, 175), (cx - 20, 200), (cx + 20, 200)], fill=ORANGE, outline=outline, width=2)
         # Wings/flippers
         d.ellipse([cx - 120, 260, cx - 70, 450], fill=body_color, outline=outline, width=2)
         d.ellipse([cx + 70, 260, cx + 120, 450], fill=body_color, outline=outline, width=2)
         # Feet
-        d.ellipse([cx - 70, 530, cx - 10, 580], fill=(255, 165, 0, 255), outline=outline, width=2)
-        d.ellipse([cx + 10, 530, cx + 70, 580], fill=(255, 165, 0, 255), outline=outline, width=2)
+        d.ellipse([cx - 70, 530, cx - 10, 580], fill=ORANGE, outline=outline, width=2)
+        d.ellipse([cx + 10, 530, cx + 70, 580], fill=ORANGE, outline=outline, width=2)
 
     elif animal == "fox":
         # Body
@@ -600,7 +1156,7 @@ def draw_animal(char: dict, width: int = 600, height: int = 800) -> Image.Image:
         # Snout (white)
         d.ellipse([cx - 40, 200, cx + 40, 270], fill=belly_color, outline=outline, width=2)
         # Nose
-        d.ellipse([cx - 10, 210, cx + 10, 230], fill=(30, 30, 30, 255))
+        d.ellipse([cx - 10, 210, cx + 10, 230], fill=NEAR_BLACK)
         # Legs
         d.rounded_rectangle([cx - 65, 490, cx - 25, 670], radius=12, fill=body_color, outline=outline, width=2)
         d.rounded_rectangle([cx + 25, 490, cx + 65, 670], radius=12, fill=body_color, outline=outline, width=2)
@@ -617,17 +1173,7 @@ def draw_animal(char: dict, width: int = 600, height: int = 800) -> Image.Image:
         eye_y = 165
     elif animal == "rabbit":
         eye_y = 210
-    eye_offset = 30
-
-    d.ellipse([cx - eye_offset - 12, eye_y - 12, cx - eye_offset + 12, eye_y + 12],
-              fill=(255, 255, 255, 255), outline=outline, width=2)
-    d.ellipse([cx + eye_offset - 12, eye_y - 12, cx + eye_offset + 12, eye_y + 12],
-              fill=(255, 255, 255, 255), outline=outline, width=2)
-    d.ellipse([cx - eye_offset - 6, eye_y - 6, cx - eye_offset + 6, eye_y + 6], fill=(30, 30, 30, 255))
-    d.ellipse([cx + eye_offset - 6, eye_y - 6, cx + eye_offset + 6, eye_y + 6], fill=(30, 30, 30, 255))
-    # Shine
-    d.ellipse([cx - eye_offset - 1, eye_y - 5, cx - eye_offset + 4, eye_y - 1], fill=(255, 255, 255, 255))
-    d.ellipse([cx + eye_offset - 1, eye_y - 5, cx + eye_offset + 4, eye_y - 1], fill=(255, 255, 255, 255))
+    d.stamp(_animal_eyes, cx, eye_y)
 
     # Mouth (smile)
     mouth_y = eye_y + 55
@@ -635,17 +1181,16 @@ def draw_animal(char: dict, width: int = 600, height: int = 800) -> Image.Image:
         mouth_y = eye_y + 40
     d.arc([cx - 15, mouth_y - 5, cx + 15, mouth_y + 10], 0, 180, fill=outline, width=2)
 
-    return img
+    return d.image()
 
 
 def draw_robot(char: dict, width: int = 600, height: int = 800) -> Image.Image:
     """Draw a simple cartoon robot character."""
-    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    d = ImageDraw.Draw(img)
+    d = _new_canvas(width, height, RENDER_SCALE)
 
-    body_color = hex_to_rgb(char["body_color"]) + (255,)
-    accent = hex_to_rgb(char["accent_color"]) + (255,)
-    outline = (40, 40, 40, 255)
+    body_color = char["_body_color_rgba"]
+    accent = char["_accent_color_rgba"]
+    outline = OUTLINE
     cx = width // 2
 
     # Antenna
@@ -656,16 +1201,15 @@ def draw_robot(char: dict, width: int = 600, height: int = 800) -> Image.Image:
     d.rounded_rectangle([cx - 70, 80, cx + 70, 220], radius=15, fill=body_color, outline=outline, width=2)
 
     # Eyes (screens)
-    d.rounded_rectangle([cx - 50, 110, cx - 10, 160], radius=5, fill=(20, 20, 30, 255), outline=accent, width=2)
-    d.rounded_rectangle([cx + 10, 110, cx + 50, 160], radius=5, fill=(20, 20, 30, 255), outline=accent, width=2)
+    d.rounded_rectangle([cx - 50, 110, cx - 10, 160], radius=5, fill=ROBOT_SCREEN, outline=accent, width=2)
+    d.rounded_rectangle([cx + 10, 110, cx + 50, 160], radius=5, fill=ROBOT_SCREEN, outline=accent, width=2)
     # Eye glow
     d.ellipse([cx - 38, 122, cx - 22, 148], fill=accent)
     d.ellipse([cx + 22, 122, cx + 38, 148], fill=accent)
 
     # Mouth (LED strip)
-    d.rounded_rectangle([cx - 35, 175, cx + 35, 195], radius=5, fill=(20, 20, 30, 255), outline=accent, width=1)
-    for i in range(5):
-        d.ellipse([cx - 28 + i * 14, 180, cx - 22 + i * 14, 190], fill=accent)
+    d.rounded_rectangle([cx - 35, 175, cx + 35, 195], radius=5, fill=ROBOT_SCREEN, outline=accent, width=1)
+    d.ellipses([(cx - 28 + i * 14, 180, cx - 22 + i * 14, 190) for i in range(5)], fill=accent)
 
     # Neck
     d.rectangle([cx - 20, 220, cx + 20, 260], fill=(140, 140, 140, 255), outline=outline, width=2)
@@ -682,44 +1226,41 @@ def draw_robot(char: dict, width: int = 600, height: int = 800) -> Image.Image:
     d.ellipse([cx + 25, 365, cx + 40, 380], fill=(60, 60, 200, 255))
 
     # Arms
-    d.rounded_rectangle([cx - 130, 280, cx - 95, 440], radius=10, fill=(140, 140, 150, 255), outline=outline, width=2)
-    d.rounded_rectangle([cx + 95, 280, cx + 130, 440], radius=10, fill=(140, 140, 150, 255), outline=outline, width=2)
+    d.rounded_rectangle([cx - 130, 280, cx - 95, 440], radius=10, fill=ROBOT_LIMB, outline=outline, width=2)
+    d.rounded_rectangle([cx + 95, 280, cx + 130, 440], radius=10, fill=ROBOT_LIMB, outline=outline, width=2)
     # Claws/hands
     d.rounded_rectangle([cx - 140, 430, cx - 90, 470], radius=8, fill=body_color, outline=outline, width=2)
     d.rounded_rectangle([cx + 90, 430, cx + 140, 470], radius=8, fill=body_color, outline=outline, width=2)
 
     # Legs
-    d.rounded_rectangle([cx - 60, 500, cx - 25, 660], radius=10, fill=(140, 140, 150, 255), outline=outline, width=2)
-    d.rounded_rectangle([cx + 25, 500, cx + 60, 660], radius=10, fill=(140, 140, 150, 255), outline=outline, width=2)
+    d.rounded_rectangle([cx - 60, 500, cx - 25, 660], radius=10, fill=ROBOT_LIMB, outline=outline, width=2)
+    d.rounded_rectangle([cx + 25, 500, cx + 60, 660], radius=10, fill=ROBOT_LIMB, outline=outline, width=2)
 
     # Feet
     d.rounded_rectangle([cx - 75, 650, cx - 15, 700], radius=10, fill=body_color, outline=outline, width=2)
     d.rounded_rectangle([cx + 15, 650, cx + 75, 700], radius=10, fill=body_color, outline=outline, width=2)
 
-    return img
-
-
-def lighten(color_hex: str, factor: float = 1.3):
-    r, g, b = hex_to_rgb(color_hex)
-    return (min(255, int(r * factor)), min(255, int(g * factor)), min(255, int(b * factor)), 255)
+    return d.image()
 
 
 def draw_3d_humanoid(char: dict, width: int = 600, height: int = 800) -> Image.Image:
     """Draw a 3D-style cartoon humanoid (Pixar/clay/lowpoly look) with shading and highlights."""
-    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    d = ImageDraw.Draw(img)
+    d = _new_canvas(width, height)
 
-    skin = hex_to_rgb(char["skin"]) + (255,)
+    skin = char["_skin_rgba"]
     skin_shadow = darken(char["skin"], 0.75)
     skin_highlight = lighten(char["skin"], 1.15)
-    hair_color = hex_to_rgb(char.get("hair", "#333333")) + (255,)
-    shirt_color = hex_to_rgb(char["shirt"]) + (255,)
+    hair_color = char["_hair_rgba"]
+    shirt_color = char["_shirt_rgba"]
     shirt_shadow = darken(char["shirt"], 0.7)
     shirt_highlight = lighten(char["shirt"], 1.2)
-    pants_color = hex_to_rgb(char["pants"]) + (255,)
+    pants_color = char["_pants_rgba"]
     pants_shadow = darken(char["pants"], 0.7)
-    outline = (30, 30, 30, 255)
+    belt_color = darken(char["pants"], 0.6)
+    brow_color = darken(char.get("hair", "#333333"), 0.8)
+    outline = OUTLINE_3D
     style = char.get("style_3d", "pixar")
+    helmet = char.get("helmet")
 
     cx = width // 2
     # 3D characters are rounder/chunkier
@@ -757,8 +1298,8 @@ def draw_3d_humanoid(char: dict, width: int = 600, height: int = 800) -> Image.I
         # Highlight on right
         d.rounded_rectangle([cx + 20, body_top + 20, cx + 70, body_top + 100], radius=15, fill=armor_h)
         # Belt
-        d.rectangle([cx - 95, body_bottom - 40, cx + 95, body_bottom - 25], fill=darken(char["pants"], 0.6))
-    elif char.get("helmet"):
+        d.rectangle([cx - 95, body_bottom - 40, cx + 95, body_bottom - 25], fill=belt_color)
+    elif helmet:
         # Spacesuit body
         d.rounded_rectangle([cx - 100, body_top, cx + 100, body_bottom], radius=30, fill=shirt_color, outline=outline, width=outline_w)
         d.rounded_rectangle([cx - 100, body_top + 10, cx - 30, body_bottom - 10], radius=20, fill=shirt_shadow)
@@ -801,7 +1342,7 @@ def draw_3d_humanoid(char: dict, width: int = 600, height: int = 800) -> Image.I
     d.ellipse([head_cx - 30, head_cy - head_ry + 10, head_cx + 30, head_cy - head_ry + 50], fill=skin_highlight)
 
     # Helmet (if astronaut)
-    if char.get("helmet"):
+    if helmet:
         d.ellipse([head_cx - head_rx - 15, head_cy - head_ry - 15, head_cx + head_rx + 15, head_cy + head_ry + 15],
                   outline=(180, 180, 190, 255), width=6)
         # Visor reflection
@@ -814,12 +1355,7 @@ def draw_3d_humanoid(char: dict, width: int = 600, height: int = 800) -> Image.I
     # --- Hair (same styles, but thicker) ---
     hs = char.get("hair_style", "neat")
     if hs == "spiky":
-        for dx in range(-55, 65, 18):
-            d.polygon([
-                (head_cx + dx - 14, head_cy - 65),
-                (head_cx + dx + 14, head_cy - 65),
-                (head_cx + dx, head_cy - 110),
-            ], fill=hair_color)
+        d.polygons(SPIKY_HAIR_3D + (head_cx, head_cy), fill=hair_color)
         d.ellipse([head_cx - 78, head_cy - 90, head_cx + 78, head_cy - 30], fill=hair_color)
     elif hs == "ponytail":
         d.ellipse([head_cx - 80, head_cy - 95, head_cx + 80, head_cy - 25], fill=hair_color)
@@ -837,26 +1373,11 @@ def draw_3d_humanoid(char: dict, width: int = 600, height: int = 800) -> Image.I
     # --- Eyes (big, expressive — 3D style) ---
     eye_y = head_cy - 5
     eye_offset = 28
-    # White (bigger)
-    d.ellipse([head_cx - eye_offset - 20, eye_y - 18, head_cx - eye_offset + 20, eye_y + 18], fill=(255, 255, 255, 255), outline=outline, width=1)
-    d.ellipse([head_cx + eye_offset - 20, eye_y - 18, head_cx + eye_offset + 20, eye_y + 18], fill=(255, 255, 255, 255), outline=outline, width=1)
-    # Iris (colored)
-    iris_color = (80, 140, 200, 255)
-    d.ellipse([head_cx - eye_offset - 10, eye_y - 10, head_cx - eye_offset + 10, eye_y + 10], fill=iris_color)
-    d.ellipse([head_cx + eye_offset - 10, eye_y - 10, head_cx + eye_offset + 10, eye_y + 10], fill=iris_color)
-    # Pupil
-    d.ellipse([head_cx - eye_offset - 5, eye_y - 5, head_cx - eye_offset + 5, eye_y + 5], fill=(20, 20, 20, 255))
-    d.ellipse([head_cx + eye_offset - 5, eye_y - 5, head_cx + eye_offset + 5, eye_y + 5], fill=(20, 20, 20, 255))
-    # Big shine
-    d.ellipse([head_cx - eye_offset + 2, eye_y - 12, head_cx - eye_offset + 12, eye_y - 4], fill=(255, 255, 255, 255))
-    d.ellipse([head_cx + eye_offset + 2, eye_y - 12, head_cx + eye_offset + 12, eye_y - 4], fill=(255, 255, 255, 255))
-    # Small shine
-    d.ellipse([head_cx - eye_offset - 6, eye_y + 2, head_cx - eye_offset - 1, eye_y + 6], fill=(255, 255, 255, 200))
-    d.ellipse([head_cx + eye_offset - 6, eye_y + 2, head_cx + eye_offset - 1, eye_y + 6], fill=(255, 255, 255, 200))
+    d.stamp(_3d_eyes, head_cx, eye_y)
 
     # Eyebrows
-    d.rounded_rectangle([head_cx - eye_offset - 18, eye_y - 28, head_cx - eye_offset + 18, eye_y - 22], radius=3, fill=darken(char.get("hair", "#333333"), 0.8))
-    d.rounded_rectangle([head_cx + eye_offset - 18, eye_y - 28, head_cx + eye_offset + 18, eye_y - 22], radius=3, fill=darken(char.get("hair", "#333333"), 0.8))
+    d.rounded_rectangle([head_cx - eye_offset - 18, eye_y - 28, head_cx - eye_offset + 18, eye_y - 22], radius=3, fill=brow_color)
+    d.rounded_rectangle([head_cx + eye_offset - 18, eye_y - 28, head_cx + eye_offset + 18, eye_y - 22], radius=3, fill=brow_color)
 
     # --- Nose (small rounded bump) ---
     nose_y = head_cy + 15
@@ -870,19 +1391,18 @@ def draw_3d_humanoid(char: dict, width: int = 600, height: int = 800) -> Image.I
     d.ellipse([head_cx - 55, head_cy + 15, head_cx - 35, head_cy + 30], fill=(255, 180, 170, 100))
     d.ellipse([head_cx + 35, head_cy + 15, head_cx + 55, head_cy + 30], fill=(255, 180, 170, 100))
 
-    return img
+    return d.image()
 
 
 def draw_3d_monster(char: dict, width: int = 600, height: int = 800) -> Image.Image:
     """Draw a 3D-style friendly monster (Monsters Inc. vibe)."""
-    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    d = ImageDraw.Draw(img)
+    d = _new_canvas(width, height)
 
-    body_color = hex_to_rgb(char["body_color"]) + (255,)
-    accent = hex_to_rgb(char["accent_color"]) + (255,)
+    body_color = char["_body_color_rgba"]
+    accent = char["_accent_color_rgba"]
     body_shadow = darken(char["body_color"], 0.7)
     body_highlight = lighten(char["body_color"], 1.2)
-    outline = (30, 30, 30, 255)
+    outline = OUTLINE_3D
     cx = width // 2
 
     # Body (big round blob)
@@ -914,55 +1434,47 @@ def draw_3d_monster(char: dict, width: int = 600, height: int = 800) -> Image.Im
 
     # Eyes (one big, one small — Monsters Inc. style)
     # Big eye
-    d.ellipse([cx - 50, 230, cx + 10, 310], fill=(255, 255, 255, 255), outline=outline, width=2)
+    d.ellipse([cx - 50, 230, cx + 10, 310], fill=WHITE, outline=outline, width=2)
     d.ellipse([cx - 30, 250, cx, 290], fill=(100, 200, 100, 255))
-    d.ellipse([cx - 22, 260, cx - 8, 278], fill=(20, 20, 20, 255))
-    d.ellipse([cx - 15, 252, cx - 7, 262], fill=(255, 255, 255, 255))
+    d.ellipse([cx - 22, 260, cx - 8, 278], fill=PUPIL_3D)
+    d.ellipse([cx - 15, 252, cx - 7, 262], fill=WHITE)
     # Small eye
-    d.ellipse([cx + 20, 250, cx + 65, 300], fill=(255, 255, 255, 255), outline=outline, width=2)
+    d.ellipse([cx + 20, 250, cx + 65, 300], fill=WHITE, outline=outline, width=2)
     d.ellipse([cx + 32, 262, cx + 53, 288], fill=(100, 200, 100, 255))
-    d.ellipse([cx + 37, 268, cx + 47, 282], fill=(20, 20, 20, 255))
-    d.ellipse([cx + 40, 263, cx + 46, 270], fill=(255, 255, 255, 255))
+    d.ellipse([cx + 37, 268, cx + 47, 282], fill=PUPIL_3D)
+    d.ellipse([cx + 40, 263, cx + 46, 270], fill=WHITE)
 
     # Mouth (wide grin with teeth)
     d.arc([cx - 55, 310, cx + 55, 380], 0, 180, fill=outline, width=4)
     # Teeth
     teeth_y = 345
-    for tx in range(-35, 40, 18):
-        d.polygon([
-            (cx + tx, teeth_y - 5),
-            (cx + tx + 10, teeth_y - 5),
-            (cx + tx + 5, teeth_y + 10),
-        ], fill=(255, 255, 255, 255), outline=outline, width=1)
+    d.polygons(MONSTER_TEETH + (cx, teeth_y), fill=WHITE, outline=outline, width=1)
 
     # Spots
     d.ellipse([cx + 60, 250, cx + 85, 275], fill=accent)
     d.ellipse([cx - 90, 350, cx - 70, 370], fill=accent)
     d.ellipse([cx + 70, 380, cx + 95, 405], fill=accent)
 
-    return img
+    return d.image()
 
 
 def draw_3d_dino(char: dict, width: int = 600, height: int = 800) -> Image.Image:
     """Draw a 3D clay-style cute dinosaur."""
-    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    d = ImageDraw.Draw(img)
+    d = _new_canvas(width, height)
 
-    body_color = hex_to_rgb(char["body_color"]) + (255,)
-    belly_color = hex_to_rgb(char["belly_color"]) + (255,)
+    body_color = char["_body_color_rgba"]
+    belly_color = char["_belly_color_rgba"]
     body_shadow = darken(char["body_color"], 0.7)
     body_highlight = lighten(char["body_color"], 1.2)
-    outline = (30, 30, 30, 255)
+    spine_color = darken(char["body_color"], 0.6)
+    outline = OUTLINE_3D
     cx = width // 2
 
     # Tail
     d.ellipse([cx + 60, 380, cx + 200, 480], fill=body_color, outline=outline, width=2)
     d.ellipse([cx + 140, 390, cx + 210, 440], fill=body_shadow)
     # Spines on tail
-    for tx in range(80, 180, 30):
-        d.polygon([
-            (cx + tx, 380), (cx + tx + 15, 380), (cx + tx + 8, 355),
-        ], fill=darken(char["body_color"], 0.6))
+    d.polygons(DINO_TAIL_SPINES + (cx, 0), fill=spine_color)
 
     # Body (round, upright)
     d.ellipse([cx - 110, 220, cx + 110, 560], fill=body_color, outline=outline, width=3)
@@ -979,10 +1491,7 @@ def draw_3d_dino(char: dict, width: int = 600, height: int = 800) -> Image.Image
     d.ellipse([cx - 90, 645, cx - 15, 710], fill=body_color, outline=outline, width=2)
     d.ellipse([cx + 15, 645, cx + 90, 710], fill=body_color, outline=outline, width=2)
     # Toes
-    for fx in [-70, -52, -34]:
-        d.ellipse([cx + fx, 680, cx + fx + 15, 710], fill=body_shadow)
-    for fx in [30, 48, 66]:
-        d.ellipse([cx + fx, 680, cx + fx + 15, 710], fill=body_shadow)
+    d.ellipses([(cx + fx, 680, cx + fx + 15, 710) for fx in (-70, -52, -34, 30, 48, 66)], fill=body_shadow)
 
     # Arms (tiny T-rex arms)
     d.rounded_rectangle([cx - 120, 310, cx - 90, 400], radius=12, fill=body_color, outline=outline, width=2)
@@ -994,24 +1503,21 @@ def draw_3d_dino(char: dict, width: int = 600, height: int = 800) -> Image.Image
     d.ellipse([cx, 100, cx + 50, 170], fill=body_highlight)
 
     # Spines on head/back
-    for sx, sy in [(-15, 65), (5, 55), (25, 65)]:
-        d.polygon([
-            (cx + sx, sy), (cx + sx + 20, sy), (cx + sx + 10, sy - 30),
-        ], fill=darken(char["body_color"], 0.6))
+    d.polygons(DINO_HEAD_SPINES + (cx, 0), fill=spine_color)
 
     # Eyes (big cute)
     eye_y = 150
-    d.ellipse([cx - 45, eye_y - 20, cx - 5, eye_y + 20], fill=(255, 255, 255, 255), outline=outline, width=2)
-    d.ellipse([cx + 5, eye_y - 20, cx + 45, eye_y + 20], fill=(255, 255, 255, 255), outline=outline, width=2)
+    d.ellipse([cx - 45, eye_y - 20, cx - 5, eye_y + 20], fill=WHITE, outline=outline, width=2)
+    d.ellipse([cx + 5, eye_y - 20, cx + 45, eye_y + 20], fill=WHITE, outline=outline, width=2)
     # Iris
     d.ellipse([cx - 32, eye_y - 10, cx - 12, eye_y + 10], fill=(80, 60, 40, 255))
     d.ellipse([cx + 12, eye_y - 10, cx + 32, eye_y + 10], fill=(80, 60, 40, 255))
     # Pupil
-    d.ellipse([cx - 26, eye_y - 5, cx - 18, eye_y + 5], fill=(20, 20, 20, 255))
-    d.ellipse([cx + 18, eye_y - 5, cx + 26, eye_y + 5], fill=(20, 20, 20, 255))
+    d.ellipse([cx - 26, eye_y - 5, cx - 18, eye_y + 5], fill=PUPIL_3D)
+    d.ellipse([cx + 18, eye_y - 5, cx + 26, eye_y + 5], fill=PUPIL_3D)
     # Shine
-    d.ellipse([cx - 20, eye_y - 14, cx - 12, eye_y - 6], fill=(255, 255, 255, 255))
-    d.ellipse([cx + 22, eye_y - 14, cx + 30, eye_y - 6], fill=(255, 255, 255, 255))
+    d.ellipse([cx - 20, eye_y - 14, cx - 12, eye_y - 6], fill=WHITE)
+    d.ellipse([cx + 22, eye_y - 14, cx + 30, eye_y - 6], fill=WHITE)
 
     # Nostrils
     d.ellipse([cx - 15, 195, cx - 5, 207], fill=body_shadow)
@@ -1023,20 +1529,53 @@ def draw_3d_dino(char: dict, width: int = 600, height: int = 800) -> Image.Image
     d.ellipse([cx - 60, 185, cx - 40, 200], fill=(255, 180, 170, 80))
     d.ellipse([cx + 40, 185, cx + 60, 200], fill=(255, 180, 170, 80))
 
-    return img
-
-
-def generate_character(char: dict, output_dir: Path) -> bool:
-    """Generate a character PNG and process it."""
+    return d.image()
+
+
+def save_texture_png(rgba: np.ndarray, path: Path) -> None:
+    """
+    Save an RGBA canvas as a paletted PNG (with per-entry alpha) when it fits in 256 colors.
+
+    The characters are flat-shaded with no antialiasing, so they use a few dozen colors and
+    the palette is exact: same pixels, ~6x smaller file than 32-bit RGBA. Anything with more
+    colors is saved as RGBA.
+    """
+    height, width = rgba.shape[:2]
+    px = np.ascontiguousarray(rgba).view(np.uint32)[..., 0]
+    colors = np.unique(px)
+    if len(colors) > 256:
+        Image.frombuffer("RGBA", (width, height), np.ascontiguousarray(rgba), "raw", "RGBA", 0, 1).save(
+            path, "PNG", compress_level=PNG_COMPRESS_LEVEL)
+        return
+    # searchsorted against the handful of sorted colors beats unique(return_inverse=True)
+    index = np.searchsorted(colors, px).astype(np.uint8)
+    palette = colors.view(np.uint8).reshape(-1, 4)
+    # Wrap the index array in place (no tobytes()/frombytes() copies) and encode straight from it
+    img = Image.frombuffer("P", (width, height), index, "raw", "P", 0, 1)
+    img.putpalette(palette[:, :3].tobytes())
+    img.save(path, "PNG", transparency=palette[:, 3].tobytes(), compress_level=PNG_COMPRESS_LEVEL)
+
+
+def render_character(char: dict, output_dir: Path):
+    """
+    Draw a character, deferring the encode/prepare work.
+
+    Returns True if the character was restored from the render cache, otherwise a
+    zero-argument callable that writes the outputs and returns success. Splitting it
+    lets a batch draw the next character while the previous one is still being encoded.
+    The caller skips characters whose texture.png already exists.
+    """
     char_dir = output_dir / char["id"]
+    char_dir.mkdir(parents=True, exist_ok=True)
 
-    # Skip if already exists
-    if (char_dir / "texture.png").exists():
-        print(f"  Already exists, skipping")
+    key = character_key(char)
+    cached = RENDER_CACHE_DIR / key
+    if cached.is_dir():
+        for name in CHARACTER_FILES:
+            shutil.copyfile(cached / name, char_dir / name)
+        print(f"  Restored from render cache ({key})")
         return True
 
-    char_dir.mkdir(parents=True, exist_ok=True)
-
     # Draw the character
     if char.get("monster"):
         img = draw_3d_monster(char)
@@ -1051,29 +1590,74 @@ def generate_character(char: dict, output_dir: Path) -> bool:
     else:
         img = draw_humanoid(char)
 
-    # Save raw PNG
-    raw_path = char_dir / "raw_generated.png"
-    img.save(str(raw_path), "PNG")
-
-    # Process with prepare-character.py
-    prepare_script = Path(os.path.dirname(__file__)) / "prepare-character.py"
-    result = subprocess.run(
-        [sys.executable, str(prepare_script), "--input", str(raw_path), "--output", str(char_dir)],
-        capture_output=True, text=True,
-    )
-    if result.returncode != 0:
-        print(f"  Processing failed: {result.stderr}")
-        # Clean up
-        raw_path.unlink(missing_ok=True)
+    # Copy out of the pooled canvas now; the next draw reuses it
+    rgba = np.asarray(img)
+    return partial(_finish_character, char_dir, rgba, cached)
+
+
+def _finish_character(char_dir: Path, rgba: np.ndarray, cached: Path) -> bool:
+    # Hand the pixels straight to prepare-character (RGBA -> OpenCV's BGRA order);
+    # no raw PNG round trip and no extra interpreter per character
+    try:
+        _prepare_module().prepare_character_array(
+            rgba[..., [2, 1, 0, 3]], char_dir, save_texture=partial(save_texture_png, rgba))
+    except Exception as e:
+        print(f"  Processing failed: {e}")
         return False
 
-    # Clean up raw file
-    raw_path.unlink(missing_ok=True)
+    _store_in_cache(char_dir, cached)
     return True
 
 
+def character_key(char: dict) -> str:
+    """Stable short hash of a character definition (plus renderer version and output settings)."""
+    definition = {k: v for k, v in char.items() if not k.startswith("_")}
+    backend = "skia" if skia is not None else "numpy"
+    settings = [RENDER_CACHE_VERSION, RENDER_SCALE, backend, RELEASE_PNG]
+    payload = json.dumps([settings, definition], sort_keys=True).encode()
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+def _store_in_cache(char_dir: Path, cached: Path) -> None:
+    """Copy a finished character into the render cache; the rename makes it atomic."""
+    RENDER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=RENDER_CACHE_DIR, prefix=".tmp-"))
+    try:
+        for name in CHARACTER_FILES:
+            shutil.copyfile(char_dir / name, tmp / name)
+        os.replace(tmp, cached)
+    except OSError:
+        # Another worker stored the same key first, or the cache is unwritable
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+@lru_cache(maxsize=None)
+def _prepare_module():
+    """Import prepare-character.py once per process (its filename is not a module name)."""
+    spec = importlib.util.spec_from_file_location("prepare_character", SCRIPT_DIR / "prepare-character.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def render_batch(job: tuple) -> list:
+    """
+    Pool worker: generate a batch of characters, returning [(char, success), ...].
+
+    Drawing stays on this thread while a single background thread encodes and writes the
+    previous character (zlib and OpenCV release the GIL), so the two overlap.
+    """
+    chars, output_dir = job
+    steps = []
+    with ThreadPoolExecutor(max_workers=1) as saver:
+        for char in chars:
+            step = render_character(char, output_dir)
+            steps.append((char, saver.submit(step) if callable(step) else step))
+        return [(char, step.result() if isinstance(step, Future) else step) for char, step in steps]
+
+
 def main():
-    output_dir = Path(os.path.dirname(os.path.dirname(__file__))) / "public" / "characters"
+    output_dir = SCRIPT_DIR.parent / "public" / "characters"
     output_dir.mkdir(parents=True, exist_ok=True)
 
     # Load existing manifest
@@ -1085,37 +1669,64 @@ def main():
         manifest = {"characters": [], "categories": ["boy", "girl", "man", "woman", "animal", "fantasy", "3d"]}
 
     existing_ids = {c["id"] for c in manifest["characters"]}
+    # One directory scan instead of a stat per character; only existing dirs are checked
+    with os.scandir(output_dir) as entries:
+        generated = {e.name for e in entries if e.is_dir() and os.path.exists(os.path.join(e.path, "texture.png"))}
 
     successful = 0
     new_count = 0
-    for i, char in enumerate(CHARACTERS, 1):
-        char_id = char["id"]
-        print(f"[{i}/{len(CHARACTERS)}] {char['name']} ({char_id})")
-
-        if char_id in existing_ids:
-            print(f"  Already in manifest, skipping")
+    pending = []
+    to_render = []
+    results = {}
+    for char in CHARACTERS:
+        if char["id"] in existing_ids:
+            print(f"{char['name']} ({char['id']}): already in manifest, skipping")
             successful += 1
             continue
-
-        if generate_character(char, output_dir):
-            manifest["characters"].append({
-                "id": char_id,
-                "name": char["name"],
-                "category": char["category"],
-                "tags": char["tags"],
-                "thumbnail": f"/characters/{char_id}/thumbnail.png",
-                "texturePath": f"/characters/{char_id}/texture.png",
-                "isPreRigged": True,
-            })
-            successful += 1
-            new_count += 1
-            print(f"  Done!")
+        pending.append(char)
+        if char["id"] in generated:
+            print(f"{char['name']} ({char['id']}): already exists, skipping")
+            results[char["id"]] = True
         else:
-            print(f"  Failed!")
-
-    # Save manifest
-    with open(manifest_path, "w") as f:
-        json.dump(manifest, f, indent=2)
+            to_render.append(char)
+
+    # Characters are independent: fan them out across processes (drawing, mask and
+    # PNG encoding are all CPU-bound); each worker imports prepare-character once
+    if to_render:
+        workers = min(os.cpu_count() or 1, len(to_render))
+        # Round-robin so each worker gets a mix of the (cheaper) 2D and 3D styles
+        jobs = [(to_render[i::workers], output_dir) for i in range(workers)]
+        ctx = multiprocessing.get_context("spawn" if sys.platform in ("darwin", "win32") else None)
+        # A pool of one only adds process startup and a second prepare-character import
+        with ctx.Pool(processes=workers, initializer=_prepare_module) if workers > 1 else nullcontext() as pool:
+            batches = pool.imap_unordered(render_batch, jobs) if pool else map(render_batch, jobs)
+            done = 0
+            for batch in batches:
+                for char, ok in batch:
+                    done += 1
+                    print(f"[{done}/{len(to_render)}] {char['name']} ({char['id']}): {'done' if ok else 'FAILED'}")
+                    results[char["id"]] = ok
+
+    # Append in definition order so the manifest stays stable across runs
+    for char in pending:
+        if not results.get(char["id"]):
+            continue
+        char_id = char["id"]
+        manifest["characters"].append({
+            "id": char_id,
+            "name": char["name"],
+            "category": char["category"],
+            "tags": char["tags"],
+            "thumbnail": f"/characters/{char_id}/thumbnail.png",
+            "texturePath": f"/characters/{char_id}/texture.png",
+            "isPreRigged": True,
+        })
+        successful += 1
+        new_count += 1
+
+    # Save manifest (untouched if every character was already in it)
+    if new_count or not manifest_path.exists():
+        _prepare_module().write_manifest(manifest_path, manifest)
 
     print(f"\nDone! {new_count} new characters generated ({successful} total in manifest)")
     print(f"Manifest: {manifest_path}")
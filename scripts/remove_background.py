@@ -8,28 +8,147 @@ Called from Node.js via child_process.spawn().
 Usage:
     python remove_background.py --input image.png --output result.png
     python remove_background.py --input image.png --output result.png --model u2net_human_seg
+    printf 'a.png\ta_out.png\nb.png\tb_out.png\n' | python remove_background.py --batch-stdin
+
+In --batch-stdin mode each stdin line is "<input>\t<output>"; the model is loaded once
+and reused for every image instead of once per process.
+
+In --server mode the process stays up for the Node app: each stdin line is a JSON
+request {"id", "input", "output", "model"} and gets one JSON reply line
+{"id", "ok", "error"} on stdout. Sessions are kept per model, so only the first
+request for a model pays for loading it.
+
+Set REMBG_INT8=1 to run the u2net-family models with int8 weights (dynamically
+quantized once with onnxruntime and cached next to the original in ~/.u2net).
+Faster on CPUs with VNNI, at a small cost in edge quality; measure before enabling.
 """
 
 import argparse
+import json
 import sys
 import os
+from contextlib import redirect_stdout
+from pathlib import Path
+
+USE_INT8 = os.environ.get("REMBG_INT8", "0") == "1"
+# Models sharing u2net's pre/post-processing, so rembg's u2net_custom session can run them
+U2NET_FAMILY = ("u2net", "u2netp", "u2net_human_seg")
+
+
+def _int8_model_path(model: str) -> Path:
+    """Path of the int8 copy of `model`, quantizing it on first use."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from rembg import new_session
+
+    home = Path(os.environ.get("U2NET_HOME", Path.home() / ".u2net"))
+    quantized = home / f"{model}_int8.onnx"
+    if not quantized.exists():
+        original = home / f"{model}.onnx"
+        if not original.exists():
+            new_session(model)  # downloads the FP32 weights
+        print(f"Quantizing {model} to int8 (one-time)...")
+        tmp = quantized.with_suffix(".tmp.onnx")
+        quantize_dynamic(str(original), str(tmp), weight_type=QuantType.QUInt8)
+        os.replace(tmp, quantized)
+    return quantized
+
+
+def load_session(model: str):
+    """rembg session for `model` (the int8 weights when REMBG_INT8=1 and supported)."""
+    from rembg import new_session
+
+    if USE_INT8 and model in U2NET_FAMILY:
+        return new_session("u2net_custom", model_path=str(_int8_model_path(model)))
+    return new_session(model)
 
 
-def remove_bg(input_path: str, output_path: str, model: str = "u2net") -> None:
-    from rembg import remove, new_session
-    from PIL import Image
+def read_rgb(input_path: str):
+    """Decode an image with OpenCV into the RGB/RGBA uint8 array rembg expects."""
+    import cv2
+    import numpy as np
 
-    session = new_session(model)
+    img = cv2.imread(input_path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError(f"Could not read image: {input_path}")
+    if img.dtype == np.uint16:
+        img = (img >> 8).astype(np.uint8)
+    if img.ndim == 2:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2RGBA)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
 
-    img = Image.open(input_path)
-    result = remove(img, session=session)
+
+def remove_bg(input_path: str, output_path: str, model: str = "u2net", session=None) -> None:
+    import cv2
+    from rembg import remove
+
+    if session is None:
+        session = load_session(model)
+
+    # ndarray in, ndarray out: no PIL image objects around the inference
+    result = remove(read_rgb(input_path), session=session)
 
     # Ensure output directory exists
     os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
-    result.save(output_path, "PNG")
+    if not cv2.imwrite(output_path, cv2.cvtColor(result, cv2.COLOR_RGBA2BGRA)):
+        raise ValueError(f"Could not write image: {output_path}")
 
     print(f"Background removed: {output_path}")
-    print(f"Size: {result.width}x{result.height}")
+    print(f"Size: {result.shape[1]}x{result.shape[0]}")
+
+
+def remove_bg_batch(pairs, model: str = "u2net") -> int:
+    """Remove backgrounds for (input, output) pairs with one shared session; returns the failure count."""
+    # Loading the ONNX weights and building the ORT session is the fixed cost
+    # (seconds); pay it once for the whole batch
+    session = load_session(model)
+    failures = 0
+    for input_path, output_path in pairs:
+        try:
+            remove_bg(input_path, output_path, model, session=session)
+        except Exception as e:
+            failures += 1
+            print(f"Error: {input_path}: {e}", file=sys.stderr)
+        sys.stdout.flush()
+    return failures
+
+
+def serve(default_model: str = "u2net") -> None:
+    """Answer JSON-line requests from stdin until it closes, reusing one session per model."""
+    sessions = {}
+    for line in iter(sys.stdin.readline, ""):
+        line = line.strip()
+        if not line:
+            continue
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            model = request.get("model") or default_model
+            if model not in sessions:
+                # Progress output goes to stderr: stdout carries only replies
+                with redirect_stdout(sys.stderr):
+                    sessions[model] = load_session(model)
+            with redirect_stdout(sys.stderr):
+                remove_bg(request["input"], request["output"], model, session=sessions[model])
+            reply = {"id": request_id, "ok": True}
+        except Exception as e:
+            reply = {"id": request_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+
+def _read_pairs(stream):
+    for line in stream:
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+        input_path, sep, output_path = line.partition("\t")
+        if not sep:
+            print(f"Error: expected '<input>\\t<output>', got: {line}", file=sys.stderr)
+            continue
+        yield input_path, output_path
 
 
 def main():
@@ -37,12 +156,11 @@ def main():
         description="Remove background from image using rembg"
     )
     parser.add_argument(
-        "--input", "-i", required=True, help="Path to input image"
+        "--input", "-i", help="Path to input image"
     )
     parser.add_argument(
         "--output",
         "-o",
-        required=True,
         help="Path to output PNG (with transparency)",
     )
     parser.add_argument(
@@ -52,9 +170,30 @@ def main():
         choices=["u2net", "u2net_human_seg", "isnet-general-use", "u2netp"],
         help="Model to use (default: u2net)",
     )
+    parser.add_argument(
+        "--server",
+        action="store_true",
+        help="Stay up and answer JSON-line requests on stdin (used by the Node app)",
+    )
+    parser.add_argument(
+        "--batch-stdin",
+        action="store_true",
+        help="Read '<input>\\t<output>' lines from stdin and process them with one model load",
+    )
 
     args = parser.parse_args()
 
+    if args.server:
+        serve(args.model)
+        return
+
+    if args.batch_stdin:
+        failures = remove_bg_batch(_read_pairs(sys.stdin), args.model)
+        sys.exit(1 if failures else 0)
+
+    if not args.input or not args.output:
+        parser.error("--input and --output are required (or use --batch-stdin / --server)")
+
     if not os.path.exists(args.input):
         print(f"Error: Input file not found: {args.input}", file=sys.stderr)
         sys.exit(1)
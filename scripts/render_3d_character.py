@@ -4,6 +4,12 @@ Blender Render Script — Render a 3D GLB/glTF model as a PNG image.
 
 Called via:
     blender -b -P scripts/render_3d_character.py -- --input model.glb --output char_dir/ [--animation idle] [--frames 1]
+    blender -b -P scripts/render_3d_character.py -- --server
+
+In --server mode one Blender process renders many models: each stdin line is a JSON job
+{"input", "output", "animation", "frames", "width", "height"} and gets one
+"@@RESULT {"ok": ..., "error": ...}" line on stdout (Blender's own log shares stdout).
+The scene is reset to factory settings between jobs.
 
 Uses EEVEE for proper material/texture rendering with transparent background.
 Falls back to Workbench if EEVEE headless fails.
@@ -12,10 +18,16 @@ Outputs texture.png (full render) and thumbnail.png (256x256 preview).
 
 import sys
 import os
+import json
 import math
+import traceback
 
 import bpy
 import mathutils
+import numpy as np
+
+# Marks protocol replies among Blender's log lines in --server mode
+RESULT_PREFIX = "@@RESULT "
 
 
 def parse_args():
@@ -30,7 +42,10 @@ def parse_args():
     i = 0
     while i < len(args):
         key = args[i]
-        if key.startswith("--") and i + 1 < len(args):
+        if key == "--server":
+            parsed["server"] = True
+            i += 1
+        elif key.startswith("--") and i + 1 < len(args):
             name = key[2:]
             val = args[i + 1]
             if name in ("frames", "width", "height"):
@@ -70,33 +85,42 @@ def import_model(filepath):
 
 def get_model_bounds():
     """Get tight bounding box of all mesh objects in world space."""
-    min_co = mathutils.Vector((float('inf'),) * 3)
-    max_co = mathutils.Vector((float('-inf'),) * 3)
+    # Accumulated as NumPy arrays; converted to mathutils.Vector on return
+    min_co = np.full(3, np.inf)
+    max_co = np.full(3, -np.inf)
     found = False
+    # Use depsgraph for accurate bounds with modifiers; evaluated once for the
+    # whole scene rather than once per mesh object
+    depsgraph = bpy.context.evaluated_depsgraph_get()
 
     for obj in bpy.context.scene.objects:
         if obj.type == 'MESH':
             found = True
-            # Use depsgraph for accurate bounds with modifiers
-            depsgraph = bpy.context.evaluated_depsgraph_get()
             obj_eval = obj.evaluated_get(depsgraph)
             mesh = obj_eval.to_mesh()
-            for v in mesh.vertices:
-                world_co = obj.matrix_world @ v.co
-                for i in range(3):
-                    min_co[i] = min(min_co[i], world_co[i])
-                    max_co[i] = max(max_co[i], world_co[i])
+            n = len(mesh.vertices)
+            if n:
+                # Bulk-copy the coordinates and transform them in one NumPy op
+                # instead of a mathutils multiply per vertex
+                co = np.empty(n * 3, dtype=np.float32)
+                mesh.vertices.foreach_get("co", co)
+                matrix = np.array(obj.matrix_world)
+                world = co.reshape(n, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+                min_co = np.minimum(min_co, world.min(axis=0))
+                max_co = np.maximum(max_co, world.max(axis=0))
             obj_eval.to_mesh_clear()
 
     if not found:
         # Fallback: use object origins
-        for obj in bpy.context.scene.objects:
-            if obj.type in ('MESH', 'ARMATURE', 'EMPTY'):
-                for i in range(3):
-                    min_co[i] = min(min_co[i], obj.location[i] - 1)
-                    max_co[i] = max(max_co[i], obj.location[i] + 1)
+        locations = np.array([
+            obj.location for obj in bpy.context.scene.objects
+            if obj.type in ('MESH', 'ARMATURE', 'EMPTY')
+        ], dtype=np.float64).reshape(-1, 3)
+        if len(locations):
+            min_co = np.minimum(min_co, locations.min(axis=0) - 1)
+            max_co = np.maximum(max_co, locations.max(axis=0) + 1)
 
-    return min_co, max_co
+    return mathutils.Vector(min_co), mathutils.Vector(max_co)
 
 
 def setup_camera(min_co, max_co):
@@ -172,6 +196,12 @@ def setup_render_eevee(width, height):
 
     # EEVEE settings
     scene.eevee.taa_render_samples = 32  # Good quality, fast
+    # EEVEE Next (4.2+): screen-space ray tracing is overkill for a character
+    # preview on a transparent background
+    if hasattr(scene.eevee, "use_raytracing"):
+        scene.eevee.use_raytracing = False
+    # Keep render data (shaders, buffers) alive between renders in this session
+    scene.render.use_persistent_data = True
 
     # Resolution
     scene.render.resolution_x = width
@@ -285,20 +315,8 @@ def create_thumbnail(texture_path, output_path, size=256):
     print(f"  Thumbnail: {new_w}x{new_h}")
 
 
-def main():
-    args = parse_args()
-
-    input_path = args.get("input")
-    output_dir = args.get("output")
-    animation_name = args.get("animation")
-    num_frames = args.get("frames", 1)
-    width = args.get("width", 600)
-    height = args.get("height", 800)
-
-    if not input_path or not output_dir:
-        print("Usage: blender -b -P render_3d_character.py -- --input model.glb --output output_dir/")
-        sys.exit(1)
-
+def render_job(input_path, output_dir, animation_name=None, num_frames=1, width=600, height=800):
+    """Render one model into output_dir (texture.png + thumbnail.png, or frame_NNNN.png)."""
     os.makedirs(output_dir, exist_ok=True)
 
     print(f"Loading model: {input_path}")
@@ -347,14 +365,64 @@ def main():
         else:
             start, step = 1, 1
 
+        # One animation job instead of a render call per frame, so Blender keeps the
+        # scene, shaders and (with persistent data) render buffers across frames
+        scene.frame_start = start
+        scene.frame_end = start + (num_frames - 1) * step
+        scene.frame_step = step
+        scene.render.use_persistent_data = True
+        scene.render.filepath = os.path.join(output_dir, "_anim_")
+        bpy.ops.render.render(animation=True)
+
+        # Blender names files by frame number; keep the frame_0000.png ... sequence
         for i in range(num_frames):
-            frame = start + i * step
-            filepath = os.path.join(output_dir, f"frame_{i:04d}.png")
-            scene.frame_set(frame)
-            scene.render.filepath = filepath
-            bpy.ops.render.render(write_still=True)
+            rendered = scene.render.frame_path(frame=start + i * step)
+            os.replace(rendered, os.path.join(output_dir, f"frame_{i:04d}.png"))
         print(f"  Rendered {num_frames} frames")
 
+
+def serve():
+    """Render JSON-line jobs from stdin in this one Blender process until stdin closes."""
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+            # Same starting state as a fresh `blender -b` (default scene, world, prefs)
+            bpy.ops.wm.read_factory_settings()
+            render_job(
+                job["input"], job["output"], job.get("animation"),
+                int(job.get("frames", 1)), int(job.get("width", 600)), int(job.get("height", 800)),
+            )
+            reply = {"ok": True}
+        except Exception as e:
+            traceback.print_exc()
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        sys.stdout.write(RESULT_PREFIX + json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+
+def main():
+    args = parse_args()
+
+    if args.get("server"):
+        serve()
+        return
+
+    input_path = args.get("input")
+    output_dir = args.get("output")
+    animation_name = args.get("animation")
+    num_frames = args.get("frames", 1)
+    width = args.get("width", 600)
+    height = args.get("height", 800)
+
+    if not input_path or not output_dir:
+        print("Usage: blender -b -P render_3d_character.py -- --input model.glb --output output_dir/")
+        sys.exit(1)
+
+    render_job(input_path, output_dir, animation_name, num_frames, width, height)
+
     print("Done!")
 
 
@@ -11,13 +11,25 @@ Outputs a video with lip sync, head movement, eye blinks, and facial expressions
 Usage:
     python sadtalker_generate.py --image face.png --audio narration.mp3 --output talking.mp4
     python sadtalker_generate.py --image face.png --audio narration.mp3 --output talking.mp4 --size 512 --enhancer gfpgan
+    python sadtalker_generate.py --server   # JSON-line jobs on stdin, models stay loaded
+
+On CUDA the face renderer (generator, keypoint detector, mapping net) runs under FP16
+autocast by default (--precision fp32 to disable). 3DMM extraction, audio-to-coefficient
+models and the GFPGAN enhancer always stay in FP32.
 """
 
 import argparse
+import hashlib
+import json
 import os
+import pickle
 import sys
 import shutil
+import tempfile
+import subprocess
 import time
+import traceback
+from functools import lru_cache
 from pathlib import Path
 
 # SadTalker installation path
@@ -61,55 +73,263 @@ def check_models():
     return True
 
 
-def generate_talking_face(
-    source_image: str,
-    driven_audio: str,
-    output_path: str,
-    size: int = 256,
-    preprocess: str = "crop",
-    still_mode: bool = False,
-    enhancer: str = None,
-    expression_scale: float = 1.0,
-    pose_style: int = 0,
-    batch_size: int = 2,
-):
+def _to_float32(value):
+    """Cast floating-point tensors (also inside dicts/lists/tuples) back to float32."""
+    import torch
+
+    if isinstance(value, torch.Tensor):
+        return value.float() if value.is_floating_point() else value
+    if isinstance(value, dict):
+        return {k: _to_float32(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_float32(v) for v in value)
+    return value
+
+
+def _autocast_fp16(module) -> None:
     """
-    Generate a talking face video using SadTalker.
+    Run `module`'s forward under CUDA FP16 autocast, handing float32 outputs back.
 
-    Args:
-        source_image: Path to the source face image
-        driven_audio: Path to the driving audio file
-        output_path: Path for the output video
-        size: Face render size (256 or 512)
-        preprocess: How to preprocess images ('crop', 'resize', 'full')
-        still_mode: Keep the original size, suitable for full body
-        enhancer: Face enhancer ('gfpgan' or None)
-        expression_scale: Expression intensity (default 1.0)
-        pose_style: Head pose style (0-45)
-        batch_size: Batch size for rendering
+    Autocast picks FP16 for the conv/matmul work (Tensor Cores) and keeps reductions
+    in FP32; casting the outputs back keeps SadTalker's own keypoint math, which
+    mixes them with FP32 tensors, unchanged.
+    """
+    import torch
+
+    forward = module.forward
+
+    def forward_fp16(*args, **kwargs):
+        with torch.autocast(device_type="cuda", dtype=torch.float16):
+            out = forward(*args, **kwargs)
+        return _to_float32(out)
+
+    module.forward = forward_fp16
+
+
+def _use_torch_stft(device: str) -> None:
+    """
+    Route SadTalker's mel-spectrogram STFT through torch.stft on `device`.
+
+    Patches src.utils.audio._stft, the FFT step of audio.melspectrogram (called from
+    get_data); pre-emphasis, the mel filterbank and dB scaling stay SadTalker's own.
+    Same framing as SadTalker's librosa 0.9.2 call (centered, zero padding, periodic
+    Hann window); a short parity check against that call keeps librosa if they differ.
+    """
+    import numpy as np
+    import torch
+    import src.utils.audio as audio
+
+    hp = audio.hp
+    if getattr(hp, "use_lws", False) or not hasattr(audio, "_stft"):
+        return
+
+    hop_size = audio.get_hop_size()
+    window = torch.hann_window(hp.win_size, device=device)
+
+    def _stft(y):
+        wav = torch.from_numpy(np.ascontiguousarray(y, dtype=np.float32)).to(device)
+        spec = torch.stft(
+            wav, n_fft=hp.n_fft, hop_length=hop_size, win_length=hp.win_size,
+            window=window, center=True, pad_mode="constant", return_complex=True,
+        )
+        return spec.cpu().numpy()
+
+    # Parity check on a short waveform, edge frames included
+    probe = np.random.default_rng(0).uniform(-1, 1, hp.n_fft + 7 * hop_size).astype(np.float32)
+    expected = audio._stft(probe)
+    actual = _stft(probe)
+    if actual.shape != expected.shape or not np.allclose(
+        actual, expected, rtol=1e-3, atol=1e-3 * float(np.abs(expected).max())
+    ):
+        print("Warning: torch.stft does not match librosa.stft, keeping librosa")
+        return
+
+    audio._stft = _stft
+
+
+# Source-image 3DMM extraction results, keyed by image content + size + preprocess mode
+COEFF_CACHE_DIR = os.path.join(SADTALKER_ROOT, ".coeff_cache")
+COEFF_CACHE_MAX_BYTES = 1 << 30
+_COEFF_CACHE_EXTS = (".mat", ".png", ".pkl")
+
+# NVENC settings for the rendered clips (roughly libx264's default quality)
+NVENC_PARAMS = ["-preset", "p4", "-rc", "vbr", "-cq", "23"]
+
+# Rough renderer working set per frame in a batch (FP32 activations; FP16 needs less),
+# used to size the default batch from free VRAM
+_RENDER_BYTES_PER_FRAME = {256: 400 << 20, 512: 1600 << 20}
+_BATCH_SIZES = (32, 16, 8, 4)
+
+
+def auto_batch_size(device: str, size: int) -> int:
+    """
+    Largest render batch that should fit in ~60% of the free VRAM.
+
+    1 on CPU, where batching buys nothing; 512 px renders are capped at 4 to leave
+    room for the GFPGAN enhancer. generate_talking_face halves it on OOM anyway.
+    """
+    if device != "cuda":
+        return 1
+    import torch
+
+    free_bytes, _ = torch.cuda.mem_get_info()
+    per_frame = _RENDER_BYTES_PER_FRAME.get(size, _RENDER_BYTES_PER_FRAME[512])
+    batch_size = next((n for n in _BATCH_SIZES if n * per_frame <= 0.6 * free_bytes), 2)
+    return min(batch_size, 4) if size >= 512 else batch_size
+
+
+@lru_cache(maxsize=None)
+def _nvenc_available() -> bool:
+    """Whether the ffmpeg that imageio writes videos with was built with h264_nvenc."""
+    try:
+        import imageio_ffmpeg
+
+        out = subprocess.run(
+            [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-encoders"],
+            capture_output=True, text=True, timeout=15,
+        ).stdout
+        return "h264_nvenc" in out
+    except Exception:
+        return False
+
+
+class _NvencImageio:
+    """
+    Stand-in for the imageio module inside SadTalker's facerender.animate.
+
+    Its mimsave() encodes .mp4 clips with h264_nvenc instead of libx264, falling back to
+    the stock call if the encoder can't start (no GPU session, old driver, ...).
+    """
+
+    def __init__(self, imageio):
+        self.wrapped = imageio
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+    def mimsave(self, uri, ims, *args, **kwargs):
+        if not str(uri).lower().endswith(".mp4"):
+            return self.wrapped.mimsave(uri, ims, *args, **kwargs)
+        ims = list(ims)  # may be a one-shot generator; needed again for the fallback
+        try:
+            return self.wrapped.mimsave(
+                uri, ims, *args, codec="h264_nvenc", quality=None,
+                pixelformat="yuv420p", output_params=NVENC_PARAMS, **kwargs,
+            )
+        except Exception as e:
+            print(f"NVENC encode failed ({e}), using libx264")
+            return self.wrapped.mimsave(uri, ims, *args, **kwargs)
+
+
+def _set_video_encoder(video_encoder: str, device: str) -> None:
+    """Point SadTalker's video writes at NVENC or back at stock imageio (libx264)."""
+    import src.facerender.animate as animate
+
+    stock = getattr(animate.imageio, "wrapped", animate.imageio)
+    if video_encoder == "auto":
+        use_nvenc = device == "cuda" and _nvenc_available()
+    else:
+        use_nvenc = video_encoder == "nvenc"
+    animate.imageio = _NvencImageio(stock) if use_nvenc else stock
+    print(f"Video encoder: {'h264_nvenc' if use_nvenc else 'libx264'}")
+
+
+def _coeff_cache_key(source_image: str, size: int, preprocess: str) -> str:
+    h = hashlib.sha1()
+    with open(source_image, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    h.update(f"|{size}|{preprocess}".encode())
+    return h.hexdigest()
+
+
+def _evict_coeff_cache() -> None:
+    """Drop least recently used entries until the cache is under COEFF_CACHE_MAX_BYTES."""
+    entries = {}
+    with os.scandir(COEFF_CACHE_DIR) as it:
+        for entry in it:
+            key, ext = os.path.splitext(entry.name)
+            if ext in _COEFF_CACHE_EXTS:
+                st = entry.stat()
+                size, mtime = entries.get(key, (0, 0.0))
+                entries[key] = (size + st.st_size, max(mtime, st.st_mtime))
+
+    total = sum(size for size, _ in entries.values())
+    for key, (size, _) in sorted(entries.items(), key=lambda kv: kv[1][1]):
+        if total <= COEFF_CACHE_MAX_BYTES:
+            break
+        for ext in _COEFF_CACHE_EXTS:
+            try:
+                os.remove(os.path.join(COEFF_CACHE_DIR, key + ext))
+            except FileNotFoundError:
+                pass
+        total -= size
+
+
+def extract_source_coeffs(preprocess_model, source_image: str, first_frame_dir: str, preprocess: str, size: int):
+    """
+    preprocess_model.generate() for the source image, cached on disk.
+
+    The same character portrait is usually reused for many narrations; a hit skips
+    face detection and 3DMM regression. Returns (coeff_path, crop_pic_path, crop_info).
+    """
+    key = _coeff_cache_key(source_image, size, preprocess)
+    coeff_cached, crop_cached, info_cached = (
+        os.path.join(COEFF_CACHE_DIR, key + ext) for ext in _COEFF_CACHE_EXTS
+    )
+    # The .pkl is written last, so its presence marks a complete entry
+    if os.path.exists(info_cached) and os.path.exists(coeff_cached) and os.path.exists(crop_cached):
+        with open(info_cached, "rb") as f:
+            crop_info = pickle.load(f)
+        for path in (coeff_cached, crop_cached, info_cached):
+            os.utime(path)  # LRU order
+        print("Using cached 3DMM coefficients for source image")
+        return coeff_cached, crop_cached, crop_info
+
+    first_coeff_path, crop_pic_path, crop_info = preprocess_model.generate(
+        source_image, first_frame_dir, preprocess, source_image_flag=True, pic_size=size
+    )
+    if first_coeff_path is None:
+        return first_coeff_path, crop_pic_path, crop_info
+
+    try:
+        os.makedirs(COEFF_CACHE_DIR, exist_ok=True)
+        shutil.copyfile(first_coeff_path, coeff_cached)
+        shutil.copyfile(crop_pic_path, crop_cached)
+        tmp = info_cached + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(crop_info, f)
+        os.replace(tmp, info_cached)
+        _evict_coeff_cache()
+    except OSError as e:
+        print(f"Warning: could not cache 3DMM coefficients: {e}")
+
+    return first_coeff_path, crop_pic_path, crop_info
+
+
+def load_models(size: int = 256, preprocess: str = "crop", precision: str = None) -> dict:
+    """
+    Build the SadTalker models for one render size / preprocess mode.
+
+    Returns a dict (device, precision, preprocess_model, audio_to_coeff,
+    animate_from_coeff) that generate_talking_face can reuse across jobs.
     """
     import torch
     from src.utils.preprocess import CropAndExtract
     from src.test_audio2coeff import Audio2Coeff
     from src.facerender.animate import AnimateFromCoeff
-    from src.generate_batch import get_data
-    from src.generate_facerender_batch import get_facerender_data
     from src.utils.init_path import init_path
 
     # Determine device
     device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"Using device: {device}")
+    if precision is None or device != "cuda":
+        precision = "fp16" if device == "cuda" else "fp32"  # FP16 autocast is CUDA-only
+    print(f"Using device: {device} ({precision})")
 
     # Setup paths
     checkpoint_dir = os.path.join(SADTALKER_ROOT, "checkpoints")
     config_dir = os.path.join(SADTALKER_ROOT, "src", "config")
 
-    # Create temp result directory
-    result_dir = os.path.join(SADTALKER_ROOT, "results")
-    os.makedirs(result_dir, exist_ok=True)
-    save_dir = os.path.join(result_dir, f"gen_{int(time.time())}")
-    os.makedirs(save_dir, exist_ok=True)
-
     # Init model paths
     sadtalker_paths = init_path(checkpoint_dir, config_dir, size, False, preprocess)
 
@@ -121,54 +341,133 @@ def generate_talking_face(
     audio_to_coeff = Audio2Coeff(sadtalker_paths, device)
     animate_from_coeff = AnimateFromCoeff(sadtalker_paths, device)
 
+    if precision == "fp16":
+        for name in ("generator", "kp_extractor", "he_estimator", "mapping"):
+            module = getattr(animate_from_coeff, name, None)
+            if module is not None:
+                _autocast_fp16(module)
+    if device == "cuda":
+        _use_torch_stft(device)
+
     load_time = time.time() - start_time
     print(f"Models loaded in {load_time:.1f}s")
 
-    # Step 1: Crop image and extract 3DMM
-    first_frame_dir = os.path.join(save_dir, "first_frame_dir")
-    os.makedirs(first_frame_dir, exist_ok=True)
-
-    print("Extracting 3DMM from source image...")
-    first_coeff_path, crop_pic_path, crop_info = preprocess_model.generate(
-        source_image, first_frame_dir, preprocess, source_image_flag=True, pic_size=size
-    )
+    return {
+        "device": device,
+        "precision": precision,
+        "preprocess_model": preprocess_model,
+        "audio_to_coeff": audio_to_coeff,
+        "animate_from_coeff": animate_from_coeff,
+    }
 
-    if first_coeff_path is None:
-        raise RuntimeError("Failed to extract face coefficients from the source image. Make sure the image contains a clear face.")
-
-    # Step 2: Audio to coefficients
-    print("Processing audio to motion coefficients...")
-    batch = get_data(first_coeff_path, driven_audio, device, ref_eyeblink_coeff_path=None, still=still_mode)
-    coeff_path = audio_to_coeff.generate(batch, save_dir, pose_style, ref_pose_coeff_path=None)
-
-    # Step 3: Render animation
-    print("Rendering talking face animation...")
-    data = get_facerender_data(
-        coeff_path, crop_pic_path, first_coeff_path, driven_audio,
-        batch_size, input_yaw_list=None, input_pitch_list=None, input_roll_list=None,
-        expression_scale=expression_scale, still_mode=still_mode,
-        preprocess=preprocess, size=size
-    )
 
-    result = animate_from_coeff.generate(
-        data, save_dir, source_image, crop_info,
-        enhancer=enhancer, background_enhancer=None,
-        preprocess=preprocess, img_size=size
-    )
+def generate_talking_face(
+    source_image: str,
+    driven_audio: str,
+    output_path: str,
+    size: int = 256,
+    preprocess: str = "crop",
+    still_mode: bool = False,
+    enhancer: str = None,
+    expression_scale: float = 1.0,
+    pose_style: int = 0,
+    batch_size: int = None,
+    precision: str = None,
+    models: dict = None,
+    video_encoder: str = "auto",
+):
+    """
+    Generate a talking face video using SadTalker.
 
-    # Move result to output path
-    output_dir = os.path.dirname(output_path)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
+    Args:
+        source_image: Path to the source face image
+        driven_audio: Path to the driving audio file
+        output_path: Path for the output video
+        size: Face render size (256 or 512)
+        preprocess: How to preprocess images ('crop', 'resize', 'full')
+        still_mode: Keep the original size, suitable for full body
+        enhancer: Face enhancer ('gfpgan' or None)
+        expression_scale: Expression intensity (default 1.0)
+        pose_style: Head pose style (0-45)
+        batch_size: Batch size for rendering (default: auto_batch_size)
+        precision: Face renderer precision ('fp16' or 'fp32'); default fp16 on CUDA
+        models: Result of load_models(size, preprocess, ...) to reuse; loaded if None
+        video_encoder: 'nvenc', 'x264', or 'auto' (NVENC on CUDA when ffmpeg has it)
+    """
+    import torch
+    from src.generate_batch import get_data
+    from src.generate_facerender_batch import get_facerender_data
 
-    shutil.move(result, output_path)
-    print(f"Talking face video saved: {output_path}")
+    start_time = time.time()
+    if models is None:
+        models = load_models(size, preprocess, precision)
+    device = models["device"]
+    preprocess_model = models["preprocess_model"]
+    audio_to_coeff = models["audio_to_coeff"]
+    animate_from_coeff = models["animate_from_coeff"]
+
+    # Create temp result directory (unique per job: a server can run several a second)
+    result_dir = os.path.join(SADTALKER_ROOT, "results")
+    os.makedirs(result_dir, exist_ok=True)
+    save_dir = tempfile.mkdtemp(prefix="gen_", dir=result_dir)
 
-    # Cleanup temp files
+    # No autograd bookkeeping anywhere in the pipeline
     try:
-        shutil.rmtree(save_dir)
-    except Exception:
-        pass
+        with torch.inference_mode():
+            # Step 1: Crop image and extract 3DMM
+            first_frame_dir = os.path.join(save_dir, "first_frame_dir")
+            os.makedirs(first_frame_dir, exist_ok=True)
+
+            print("Extracting 3DMM from source image...")
+            first_coeff_path, crop_pic_path, crop_info = extract_source_coeffs(
+                preprocess_model, source_image, first_frame_dir, preprocess, size
+            )
+
+            if first_coeff_path is None:
+                raise RuntimeError("Failed to extract face coefficients from the source image. Make sure the image contains a clear face.")
+
+            # Step 2: Audio to coefficients
+            print("Processing audio to motion coefficients...")
+            batch = get_data(first_coeff_path, driven_audio, device, ref_eyeblink_coeff_path=None, still=still_mode)
+            coeff_path = audio_to_coeff.generate(batch, save_dir, pose_style, ref_pose_coeff_path=None)
+
+            # Step 3: Render animation (halving the batch if it runs out of VRAM)
+            _set_video_encoder(video_encoder, device)
+            if batch_size is None:
+                batch_size = auto_batch_size(device, size)
+            while True:
+                print(f"Rendering talking face animation (batch size {batch_size})...")
+                data = get_facerender_data(
+                    coeff_path, crop_pic_path, first_coeff_path, driven_audio,
+                    batch_size, input_yaw_list=None, input_pitch_list=None, input_roll_list=None,
+                    expression_scale=expression_scale, still_mode=still_mode,
+                    preprocess=preprocess, size=size
+                )
+                try:
+                    result = animate_from_coeff.generate(
+                        data, save_dir, source_image, crop_info,
+                        enhancer=enhancer, background_enhancer=None,
+                        preprocess=preprocess, img_size=size
+                    )
+                    break
+                except RuntimeError as e:  # torch.cuda.OutOfMemoryError on torch >= 1.13
+                    if "out of memory" not in str(e) or batch_size <= 1:
+                        raise
+                    del data
+                    torch.cuda.empty_cache()
+                    batch_size //= 2
+                    print(f"Out of GPU memory, retrying with batch size {batch_size}")
+
+            # Move result to output path
+            output_dir = os.path.dirname(output_path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+
+            shutil.move(result, output_path)
+            print(f"Talking face video saved: {output_path}")
+    finally:
+        # Cleanup temp files
+        shutil.rmtree(save_dir, ignore_errors=True)
 
     total_time = time.time() - start_time
     print(f"Total generation time: {total_time:.1f}s")
@@ -176,21 +475,93 @@ def generate_talking_face(
     return output_path
 
 
+def serve(precision: str = None, video_encoder: str = "auto") -> None:
+    """
+    Answer JSON-line jobs from stdin until it closes, keeping models loaded between jobs.
+
+    Request: {"id", "image", "audio", "output", plus optional "size", "preprocess",
+    "still", "enhancer", "expression_scale", "pose_style", "batch_size"}.
+    Reply (stdout): {"id", "ok", "error"}. Progress output goes to stderr.
+    """
+    # Replies go to a private copy of stdout and fd 1 is pointed at stderr, so neither
+    # progress prints nor SadTalker's ffmpeg children can interleave with the protocol
+    sys.stdout.flush()
+    replies = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+
+    models_by_key = {}
+    for line in iter(sys.stdin.readline, ""):
+        line = line.strip()
+        if not line:
+            continue
+        job_id = None
+        try:
+            job = json.loads(line)
+            job_id = job.get("id")
+            size = int(job.get("size", 256))
+            preprocess = job.get("preprocess", "crop")
+            for key in ("image", "audio"):
+                if not os.path.exists(job[key]):
+                    raise FileNotFoundError(f"{key.capitalize()} not found: {job[key]}")
+            if (size, preprocess) not in models_by_key:
+                models_by_key[(size, preprocess)] = load_models(size, preprocess, precision)
+            generate_talking_face(
+                source_image=job["image"],
+                driven_audio=job["audio"],
+                output_path=job["output"],
+                size=size,
+                preprocess=preprocess,
+                still_mode=bool(job.get("still", False)),
+                enhancer=job.get("enhancer"),
+                expression_scale=float(job.get("expression_scale", 1.0)),
+                pose_style=int(job.get("pose_style", 0)),
+                batch_size=job.get("batch_size"),
+                models=models_by_key[(size, preprocess)],
+                video_encoder=video_encoder,
+            )
+            reply = {"id": job_id, "ok": True}
+        except Exception as e:
+            traceback.print_exc()
+            reply = {"id": job_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+        sys.stdout.flush()
+        replies.write(json.dumps(reply) + "\n")
+        replies.flush()
+
+
 def main():
     parser = argparse.ArgumentParser(description="Generate talking face video with SadTalker")
-    parser.add_argument("--image", required=True, help="Path to source face image")
-    parser.add_argument("--audio", required=True, help="Path to driving audio file")
-    parser.add_argument("--output", required=True, help="Path for output video")
+    parser.add_argument("--image", help="Path to source face image")
+    parser.add_argument("--audio", help="Path to driving audio file")
+    parser.add_argument("--output", help="Path for output video")
     parser.add_argument("--size", type=int, default=256, choices=[256, 512], help="Face render size")
     parser.add_argument("--preprocess", default="crop", choices=["crop", "resize", "full"], help="Image preprocessing mode")
     parser.add_argument("--still", action="store_true", help="Still mode (less head motion)")
     parser.add_argument("--enhancer", default=None, choices=["gfpgan", None], help="Face enhancer")
     parser.add_argument("--expression-scale", type=float, default=1.0, help="Expression intensity")
     parser.add_argument("--pose-style", type=int, default=0, help="Head pose style (0-45)")
-    parser.add_argument("--batch-size", type=int, default=2, help="Render batch size")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Render batch size (default: largest that fits free VRAM, 1 on CPU)")
+    parser.add_argument("--precision", default=None, choices=["fp16", "fp32"],
+                        help="Face renderer precision (default: fp16 on CUDA, fp32 on CPU)")
+    parser.add_argument("--video-encoder", default="auto", choices=["auto", "nvenc", "x264"],
+                        help="H.264 encoder for the clip (default: NVENC on CUDA when ffmpeg supports it)")
+    parser.add_argument("--server", action="store_true",
+                        help="Stay up and answer JSON-line jobs on stdin, keeping models loaded (used by the Node app)")
 
     args = parser.parse_args()
 
+    # Check models
+    if not check_models():
+        print("Please download SadTalker models first.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.server:
+        serve(args.precision, args.video_encoder)
+        return
+
+    if not (args.image and args.audio and args.output):
+        parser.error("--image, --audio and --output are required (or use --server)")
+
     # Validate inputs
     if not os.path.exists(args.image):
         print(f"Error: Image not found: {args.image}", file=sys.stderr)
@@ -200,11 +571,6 @@ def main():
         print(f"Error: Audio not found: {args.audio}", file=sys.stderr)
         sys.exit(1)
 
-    # Check models
-    if not check_models():
-        print("Please download SadTalker models first.", file=sys.stderr)
-        sys.exit(1)
-
     try:
         generate_talking_face(
             source_image=args.image,
@@ -217,10 +583,11 @@ def main():
             expression_scale=args.expression_scale,
             pose_style=args.pose_style,
             batch_size=args.batch_size,
+            precision=args.precision,
+            video_encoder=args.video_encoder,
         )
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
-        import traceback
         traceback.print_exc()
         sys.exit(1)
 
@@ -11,13 +11,16 @@ Usage:
 Requires: Blender installed (winget install BlenderFoundation.Blender)
 """
 
+import collections
 import json
 import os
 import subprocess
 import sys
 import shutil
+import threading
 import zipfile
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Blender path
@@ -28,6 +31,9 @@ BLENDER_PATHS = [
     r"C:\Program Files\Blender Foundation\Blender 3.6\blender.exe",
 ]
 
+# Blender renders to run at once (each is its own process)
+MAX_PARALLEL_RENDERS = 4
+
 # Quaternius CC0 character packs — direct download links
 # These are all public domain (CC0) licensed
 QUATERNIUS_PACKS = {
@@ -111,19 +117,35 @@ def find_blender() -> str:
 
 
 def download_file(url: str, output_path: str) -> bool:
-    """Download a file from URL."""
+    """Download a file from URL, streaming it to disk in 1 MB chunks."""
+    # Written under a temporary name so an interrupted download never looks cached
+    part_path = output_path + ".part"
     try:
         print(f"  Downloading: {url[:80]}...")
         req = urllib.request.Request(url, headers={"User-Agent": "FlowSmartly/1.0"})
         with urllib.request.urlopen(req, timeout=120) as response:
-            data = response.read()
-            with open(output_path, "wb") as f:
-                f.write(data)
-        size_mb = len(data) / (1024 * 1024)
+            total = int(response.headers.get("Content-Length") or 0)
+            done = 0
+            next_report = 0.25
+            with open(part_path, "wb") as f:
+                for chunk in iter(lambda: response.read(1 << 20), b""):
+                    f.write(chunk)
+                    done += len(chunk)
+                    if total and done / total >= next_report and done < total:
+                        print(f"  ... {done / total:.0%}")
+                        next_report += 0.25
+        if total and done != total:
+            raise IOError(f"incomplete download ({done} of {total} bytes)")
+        os.replace(part_path, output_path)
+        size_mb = os.path.getsize(output_path) / (1024 * 1024)
         print(f"  Downloaded: {size_mb:.1f} MB")
         return True
     except Exception as e:
         print(f"  Download failed: {e}")
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
         return False
 
 
@@ -131,20 +153,35 @@ def download_pack(pack_name: str, pack_info: dict, cache_dir: Path) -> Path:
     """Download and extract a character pack."""
     pack_dir = cache_dir / pack_name
     zip_path = cache_dir / f"{pack_name}.zip"
+    # Written after a verified, complete extraction: one stat instead of walking the pack
+    marker = pack_dir / ".extracted_ok"
 
-    if pack_dir.exists() and any(pack_dir.rglob("*.glb")) or any(pack_dir.rglob("*.fbx")):
+    if marker.exists():
         print(f"  Pack already cached: {pack_dir}")
         return pack_dir
-
-    print(f"  Downloading pack: {pack_info['description']}")
-    if not download_file(pack_info["url"], str(zip_path)):
+    if zip_path.exists():
+        # Complete download (download_file renames it into place) left by an
+        # interrupted run: verify and extract it again below
+        print(f"  Re-extracting downloaded pack: {zip_path}")
+    elif pack_dir.exists() and (any(pack_dir.rglob("*.glb")) or any(pack_dir.rglob("*.fbx"))):
+        # Extracted before the marker existed; the zip is gone, so it can't be
+        # verified and gets no marker
+        print(f"  Pack already cached (unverified): {pack_dir}")
         return pack_dir
+    else:
+        print(f"  Downloading pack: {pack_info['description']}")
+        if not download_file(pack_info["url"], str(zip_path)):
+            return pack_dir
 
     # Extract
     pack_dir.mkdir(parents=True, exist_ok=True)
     try:
         with zipfile.ZipFile(str(zip_path), 'r') as z:
+            bad_member = z.testzip()
+            if bad_member is not None:
+                raise zipfile.BadZipFile(f"corrupt member {bad_member}")
             z.extractall(str(pack_dir))
+        marker.touch()
         print(f"  Extracted to: {pack_dir}")
     except Exception as e:
         print(f"  Extract failed: {e}")
@@ -175,49 +212,113 @@ def find_model_in_pack(pack_dir: Path, glob_pattern: str, fallback_pattern: str
     return None
 
 
+# One long-lived `render_3d_character.py --server` Blender per worker thread, so
+# Blender's startup and add-on init are paid once per thread instead of per model
+RESULT_PREFIX = "@@RESULT "
+RENDER_TIMEOUT_S = 120
+_blender_local = threading.local()
+_blender_procs = []
+_blender_procs_lock = threading.Lock()
+
+
+def _blender_server(blender_path: str, script_path: str) -> subprocess.Popen:
+    """This thread's Blender render server, (re)started if needed."""
+    proc = getattr(_blender_local, "proc", None)
+    if proc is not None and proc.poll() is None:
+        return proc
+
+    proc = subprocess.Popen(
+        [blender_path, "-b", "-P", script_path, "--", "--server"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, bufsize=1, errors="replace",
+    )
+    _blender_local.proc = proc
+    with _blender_procs_lock:
+        _blender_procs.append(proc)
+    return proc
+
+
+def stop_blender_servers() -> None:
+    """Close every render server's stdin (its exit signal) and wait for it."""
+    with _blender_procs_lock:
+        procs, _blender_procs[:] = list(_blender_procs), []
+    for proc in procs:
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=30)
+        except Exception:
+            proc.kill()
+
+
 def render_model(blender_path: str, model_path: str, output_dir: str, script_path: str) -> bool:
-    """Render a 3D model using Blender."""
-    cmd = [
-        blender_path, "-b", "-P", script_path,
-        "--", "--input", model_path, "--output", output_dir,
-        "--width", "600", "--height", "800",
-    ]
+    """Render a 3D model using this thread's Blender render server."""
+    job = {"input": model_path, "output": output_dir, "width": 600, "height": 800}
 
     print(f"  Rendering with Blender...")
+    proc = _blender_server(blender_path, script_path)
+    # Blender's log shares the pipe: skim it for the reply, keep a tail for errors
+    tail = collections.deque(maxlen=10)
+    result = None
+    watchdog = threading.Timer(RENDER_TIMEOUT_S, proc.kill)
+    watchdog.start()
     try:
-        result = subprocess.run(
-            cmd, capture_output=True, text=True, timeout=120,
-        )
-        if result.returncode != 0:
+        proc.stdin.write(json.dumps(job) + "\n")
+        proc.stdin.flush()
+        for line in proc.stdout:
+            if line.startswith(RESULT_PREFIX):
+                result = json.loads(line[len(RESULT_PREFIX):])
+                break
+            tail.append(line.rstrip())
+    except Exception as e:
+        print(f"  Blender render error: {e}")
+        proc.kill()
+        _blender_local.proc = None
+        return False
+    finally:
+        timed_out = not watchdog.is_alive() and result is None
+        watchdog.cancel()
+
+    if result is None:
+        # The server died or was killed by the watchdog; the next job starts a new one
+        proc.kill()
+        _blender_local.proc = None
+        if timed_out:
+            print(f"  Blender render timed out ({RENDER_TIMEOUT_S}s)")
+        else:
             print(f"  Blender render failed:")
-            # Show last 10 lines of stderr
-            for line in result.stderr.strip().split("\n")[-10:]:
+            for line in tail:
                 print(f"    {line}")
-            return False
-        return True
-    except subprocess.TimeoutExpired:
-        print("  Blender render timed out (120s)")
         return False
-    except Exception as e:
-        print(f"  Blender render error: {e}")
+    if not result.get("ok"):
+        print(f"  Blender render failed: {result.get('error')}")
+        for line in tail:
+            print(f"    {line}")
         return False
+    return True
 
 
-def create_mask_from_texture(char_dir: Path):
-    """Create a binary mask from the rendered RGBA texture."""
+def load_texture(char_dir: Path):
+    """Decode texture.png once as RGBA for the mask/skeleton/thumbnail helpers (None if unavailable)."""
     try:
         from PIL import Image
-        import numpy as np
 
-        texture_path = char_dir / "texture.png"
-        if not texture_path.exists():
-            return
+        return Image.open(str(char_dir / "texture.png")).convert("RGBA")
+    except Exception:
+        return None
 
-        img = Image.open(str(texture_path)).convert("RGBA")
-        alpha = np.array(img)[:, :, 3]
-        mask = ((alpha > 10).astype(np.uint8)) * 255
 
-        mask_img = Image.fromarray(mask, mode="L")
+def create_mask_from_texture(char_dir: Path, img=None):
+    """Create a binary mask from the rendered RGBA texture (`img`: already-decoded texture)."""
+    try:
+        from PIL import Image
+
+        texture_path = char_dir / "texture.png"
+        if img is None:
+            if not texture_path.exists():
+                return
+            img = Image.open(str(texture_path)).convert("RGBA")
+        # alpha > 10 -> 255 as a 256-entry lookup table, applied in C in one pass
+        mask_img = img.getchannel("A").point(lambda v: 255 if v > 10 else 0)
         mask_img.save(str(char_dir / "mask.png"))
         print(f"  Mask created from alpha channel")
     except ImportError:
@@ -226,33 +327,43 @@ def create_mask_from_texture(char_dir: Path):
         print(f"  Mask creation failed: {e}")
 
 
-def create_simple_skeleton(char_dir: Path):
+def create_simple_skeleton(char_dir: Path, size: tuple = None):
     """Create a simple humanoid skeleton config for AnimatedDrawings compatibility."""
-    try:
-        from PIL import Image
-        img = Image.open(str(char_dir / "texture.png"))
-        width, height = img.size
-    except Exception:
-        width, height = 600, 800
+    if size is not None:
+        width, height = size
+    else:
+        try:
+            from PIL import Image
+            img = Image.open(str(char_dir / "texture.png"))
+            width, height = img.size
+        except Exception:
+            width, height = 600, 800
 
     cx = width // 2
+    neck_y = int(height * 0.22)
+    torso_y = int(height * 0.40)
+    hip_y = int(height * 0.55)
+    knee_y = int(height * 0.75)
+    foot_y = int(height * 0.95)
+    shoulder_offset = int(width * 0.2)
+    hip_offset = int(width * 0.1)
     skeleton = [
-        {"loc": [cx, int(height * 0.55)], "name": "root", "parent": None},
-        {"loc": [cx, int(height * 0.55)], "name": "hip", "parent": "root"},
-        {"loc": [cx, int(height * 0.40)], "name": "torso", "parent": "hip"},
-        {"loc": [cx, int(height * 0.22)], "name": "neck", "parent": "torso"},
-        {"loc": [cx - int(width * 0.2), int(height * 0.40)], "name": "right_shoulder", "parent": "torso"},
-        {"loc": [cx - int(width * 0.2) - 20, int(height * 0.40) + 30], "name": "right_elbow", "parent": "right_shoulder"},
-        {"loc": [cx - int(width * 0.2) - 40, int(height * 0.40) + 60], "name": "right_hand", "parent": "right_elbow"},
-        {"loc": [cx + int(width * 0.2), int(height * 0.40)], "name": "left_shoulder", "parent": "torso"},
-        {"loc": [cx + int(width * 0.2) + 20, int(height * 0.40) + 30], "name": "left_elbow", "parent": "left_shoulder"},
-        {"loc": [cx + int(width * 0.2) + 40, int(height * 0.40) + 60], "name": "left_hand", "parent": "left_elbow"},
-        {"loc": [cx - int(width * 0.1), int(height * 0.55)], "name": "right_hip", "parent": "root"},
-        {"loc": [cx - int(width * 0.1), int(height * 0.75)], "name": "right_knee", "parent": "right_hip"},
-        {"loc": [cx - int(width * 0.1), int(height * 0.95)], "name": "right_foot", "parent": "right_knee"},
-        {"loc": [cx + int(width * 0.1), int(height * 0.55)], "name": "left_hip", "parent": "root"},
-        {"loc": [cx + int(width * 0.1), int(height * 0.75)], "name": "left_knee", "parent": "left_hip"},
-        {"loc": [cx + int(width * 0.1), int(height * 0.95)], "name": "left_foot", "parent": "left_knee"},
+        {"loc": [cx, hip_y], "name": "root", "parent": None},
+        {"loc": [cx, hip_y], "name": "hip", "parent": "root"},
+        {"loc": [cx, torso_y], "name": "torso", "parent": "hip"},
+        {"loc": [cx, neck_y], "name": "neck", "parent": "torso"},
+        {"loc": [cx - shoulder_offset, torso_y], "name": "right_shoulder", "parent": "torso"},
+        {"loc": [cx - shoulder_offset - 20, torso_y + 30], "name": "right_elbow", "parent": "right_shoulder"},
+        {"loc": [cx - shoulder_offset - 40, torso_y + 60], "name": "right_hand", "parent": "right_elbow"},
+        {"loc": [cx + shoulder_offset, torso_y], "name": "left_shoulder", "parent": "torso"},
+        {"loc": [cx + shoulder_offset + 20, torso_y + 30], "name": "left_elbow", "parent": "left_shoulder"},
+        {"loc": [cx + shoulder_offset + 40, torso_y + 60], "name": "left_hand", "parent": "left_elbow"},
+        {"loc": [cx - hip_offset, hip_y], "name": "right_hip", "parent": "root"},
+        {"loc": [cx - hip_offset, knee_y], "name": "right_knee", "parent": "right_hip"},
+        {"loc": [cx - hip_offset, foot_y], "name": "right_foot", "parent": "right_knee"},
+        {"loc": [cx + hip_offset, hip_y], "name": "left_hip", "parent": "root"},
+        {"loc": [cx + hip_offset, knee_y], "name": "left_knee", "parent": "left_hip"},
+        {"loc": [cx + hip_offset, foot_y], "name": "left_foot", "parent": "left_knee"},
     ]
 
     try:
@@ -278,8 +389,8 @@ def create_simple_skeleton(char_dir: Path):
         print(f"  Skeleton config (manual YAML): {width}x{height}, {len(skeleton)} joints")
 
 
-def create_thumbnail_from_texture(char_dir: Path, size: int = 256):
-    """Create a thumbnail from the texture if Blender didn't create one."""
+def create_thumbnail_from_texture(char_dir: Path, img=None, size: int = 256):
+    """Create a thumbnail from the texture if Blender didn't create one (`img`: already-decoded texture)."""
     thumbnail_path = char_dir / "thumbnail.png"
     texture_path = char_dir / "texture.png"
 
@@ -290,23 +401,15 @@ def create_thumbnail_from_texture(char_dir: Path, size: int = 256):
         return
 
     try:
-        from PIL import Image
-        import numpy as np
-
-        img = Image.open(str(texture_path)).convert("RGBA")
-        w, h = img.size
+        from PIL import Image, ImageOps
 
-        # Scale to fit in size x size
-        scale = min(size / w, size / h)
-        new_w, new_h = int(w * scale), int(h * scale)
-        resized = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-
-        # Center on transparent canvas
-        canvas = Image.new("RGBA", (size, size), (0, 0, 0, 0))
-        x_off = (size - new_w) // 2
-        y_off = (size - new_h) // 2
-        canvas.paste(resized, (x_off, y_off))
+        if img is None:
+            img = Image.open(str(texture_path)).convert("RGBA")
 
+        # Scale to fit in size x size, centered on a transparent canvas
+        canvas = ImageOps.pad(
+            img, (size, size), method=Image.Resampling.LANCZOS, color=(0, 0, 0, 0), centering=(0.5, 0.5),
+        )
         canvas.save(str(thumbnail_path))
         print(f"  Thumbnail: {size}x{size}")
     except ImportError:
@@ -314,6 +417,83 @@ def create_thumbnail_from_texture(char_dir: Path, size: int = 256):
         shutil.copy2(str(texture_path), str(thumbnail_path))
 
 
+def process_character(char_info: dict, pack_dirs: dict, cache_dir: Path, output_dir: Path,
+                      blender_path: str, render_script: Path) -> bool:
+    """Find/download, render and finish one character. Returns True if its texture exists."""
+    char_id = char_info["id"]
+    char_dir = output_dir / char_id
+    label = f"[{char_id}] "
+
+    # Find the model file
+    model_path = None
+    if char_info.get("source") == "quaternius":
+        pack_name = char_info.get("pack")
+        if pack_name and pack_name in pack_dirs:
+            model_path = find_model_in_pack(
+                pack_dirs[pack_name],
+                char_info.get("glob_pattern", "*"),
+                char_info.get("fallback_pattern"),
+            )
+    elif char_info.get("url"):
+        # Direct download
+        model_filename = char_id + os.path.splitext(char_info["url"])[1]
+        model_path_candidate = cache_dir / model_filename
+        if not model_path_candidate.exists():
+            if download_file(char_info["url"], str(model_path_candidate)):
+                model_path = model_path_candidate
+        else:
+            model_path = model_path_candidate
+
+    if not model_path or not model_path.exists():
+        print(f"  {label}Model not found, skipping")
+        return False
+
+    print(f"  {label}Model: {model_path}")
+
+    # Render with Blender
+    char_dir.mkdir(parents=True, exist_ok=True)
+    if not render_model(blender_path, str(model_path), str(char_dir), str(render_script)):
+        print(f"  {label}Render failed, skipping")
+        return False
+
+    # Decode the texture once for the three helpers below
+    texture = load_texture(char_dir)
+
+    # Create mask from alpha channel
+    create_mask_from_texture(char_dir, texture)
+
+    # Create skeleton config for AnimatedDrawings
+    create_simple_skeleton(char_dir, texture.size if texture is not None else None)
+
+    # Create thumbnail if Blender didn't
+    create_thumbnail_from_texture(char_dir, texture)
+
+    # Verify texture exists
+    if not (char_dir / "texture.png").exists():
+        print(f"  {label}ERROR: texture.png not created")
+        return False
+
+    print(f"  {label}OK!")
+    return True
+
+
+def write_manifest(manifest_path: Path, manifest: dict) -> None:
+    """
+    Write manifest.json, with orjson when available (same 2-space layout).
+
+    Written to a temporary file and swapped in, so a crash mid-write never leaves a
+    truncated manifest behind.
+    """
+    try:
+        import orjson
+        data = orjson.dumps(manifest, option=orjson.OPT_INDENT_2)
+    except ImportError:
+        data = json.dumps(manifest, indent=2).encode()
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, manifest_path)
+
+
 def main():
     project_root = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     output_dir = project_root / "public" / "characters"
@@ -355,83 +535,56 @@ def main():
     successful = 0
     total = len(CHARACTER_MODELS)
 
+    pending = []
     for i, char_info in enumerate(CHARACTER_MODELS, 1):
         char_id = char_info["id"]
-        char_dir = output_dir / char_id
-
-        print(f"\n[{i}/{total}] {char_info['name']} ({char_id})")
 
         # Skip if already fully processed
-        if char_id in existing_ids and (char_dir / "texture.png").exists():
-            print(f"  Already exists, skipping")
+        if char_id in existing_ids and (output_dir / char_id / "texture.png").exists():
+            print(f"[{i}/{total}] {char_info['name']} ({char_id}): already exists, skipping")
             successful += 1
             continue
 
-        # Find the model file
-        model_path = None
-        if char_info.get("source") == "quaternius":
-            pack_name = char_info.get("pack")
-            if pack_name and pack_name in pack_dirs:
-                model_path = find_model_in_pack(
-                    pack_dirs[pack_name],
-                    char_info.get("glob_pattern", "*"),
-                    char_info.get("fallback_pattern"),
+        pending.append(char_info)
+
+    if pending:
+        # Characters are independent (downloads, separate Blender processes, PIL work),
+        # so render several at once
+        workers = min(MAX_PARALLEL_RENDERS, os.cpu_count() or 1, len(pending))
+        print(f"\nProcessing {len(pending)} characters with {workers} parallel worker(s)...")
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(
+                    lambda char_info: process_character(
+                        char_info, pack_dirs, cache_dir, output_dir, blender_path, render_script,
+                    ),
+                    pending,
                 )
-        elif char_info.get("url"):
-            # Direct download
-            model_filename = char_id + os.path.splitext(char_info["url"])[1]
-            model_path_candidate = cache_dir / model_filename
-            if not model_path_candidate.exists():
-                if download_file(char_info["url"], str(model_path_candidate)):
-                    model_path = model_path_candidate
-            else:
-                model_path = model_path_candidate
-
-        if not model_path or not model_path.exists():
-            print(f"  Model not found, skipping")
-            continue
-
-        print(f"  Model: {model_path}")
-
-        # Render with Blender
-        char_dir.mkdir(parents=True, exist_ok=True)
-        if not render_model(blender_path, str(model_path), str(char_dir), str(render_script)):
-            print(f"  Render failed, skipping")
-            continue
-
-        # Create mask from alpha channel
-        create_mask_from_texture(char_dir)
-
-        # Create skeleton config for AnimatedDrawings
-        create_simple_skeleton(char_dir)
-
-        # Create thumbnail if Blender didn't
-        create_thumbnail_from_texture(char_dir)
-
-        # Verify texture exists
-        if not (char_dir / "texture.png").exists():
-            print(f"  ERROR: texture.png not created")
-            continue
 
-        # Add to manifest
-        if char_id not in existing_ids:
-            manifest["characters"].append({
-                "id": char_id,
-                "name": char_info["name"],
-                "category": char_info["category"],
-                "tags": char_info["tags"],
-                "thumbnail": f"/characters/{char_id}/thumbnail.png",
-                "texturePath": f"/characters/{char_id}/texture.png",
-                "isPreRigged": True,
-            })
-            existing_ids.add(char_id)
-
-        successful += 1
-        print(f"  OK!")
+                # Add to manifest as results arrive (in definition order, on this thread only),
+                # saving after each new character so an interrupted run keeps its progress
+                for char_info, ok in zip(pending, results):
+                    if not ok:
+                        continue
+                    char_id = char_info["id"]
+                    if char_id not in existing_ids:
+                        manifest["characters"].append({
+                            "id": char_id,
+                            "name": char_info["name"],
+                            "category": char_info["category"],
+                            "tags": char_info["tags"],
+                            "thumbnail": f"/characters/{char_id}/thumbnail.png",
+                            "texturePath": f"/characters/{char_id}/texture.png",
+                            "isPreRigged": True,
+                        })
+                        existing_ids.add(char_id)
+                        write_manifest(manifest_path, manifest)
+                    successful += 1
+        finally:
+            stop_blender_servers()
 
     # Save manifest
-    with open(manifest_path, "w") as f:
-        json.dump(manifest, f, indent=2)
+    write_manifest(manifest_path, manifest)
 
     print(f"\n=== Done! ===")
     print(f"Processed: {successful}/{total} characters")
@@ -49,7 +49,7 @@ class FlowImageClient {
     const {
       width = 384,
       height = 384,
-      steps = 12,
+      steps, // undefined: server picks a step count for its scheduler
       guidanceScale = 7.5,
       negativePrompt = "blurry, low quality, deformed, ugly, bad anatomy, watermark, text, signature, extra limbs, extra fingers, mutated hands, poorly drawn",
     } = options;
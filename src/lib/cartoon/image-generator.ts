@@ -47,7 +47,6 @@ async function generateWithProvider(
     return flowImageClient.generateImage(prompt, {
       width: Math.min(options.width, 384),   // Generate at 384, server upscales to 512
       height: Math.min(options.height, 384),
-      steps: 12,                              // DPM++ 2M Karras converges in 12 steps
       guidanceScale: 7.5,
     });
   }
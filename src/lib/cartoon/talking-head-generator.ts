@@ -10,7 +10,8 @@
  * Priority: SadTalker (local, free) → D-ID API (cloud, paid)
  */
 
-import { spawn } from "child_process";
+import { spawn, type ChildProcessWithoutNullStreams } from "child_process";
+import { createInterface } from "readline";
 import { writeFile, mkdir, readFile, access, stat } from "fs/promises";
 import path from "path";
 import { existsSync } from "fs";
@@ -23,6 +24,7 @@ const D_ID_API_URL = "https://api.d-id.com";
 const SADTALKER_PATH = process.env.SADTALKER_PATH || path.resolve(process.cwd(), "..", "SadTalker");
 const SADTALKER_SCRIPT = path.join(process.cwd(), "scripts", "sadtalker_generate.py");
 const PYTHON_PATH = process.env.SADTALKER_PYTHON_PATH || "python";
+const WORKER_IDLE_MS = 10 * 60_000; // free the models (and GPU memory) after 10 idle minutes
 
 export interface TalkingHeadOptions {
   imageUrl: string; // URL or local path to character image
@@ -86,72 +88,137 @@ async function createTalkingHeadSadTalker(
   console.log(`[SadTalker] Image: ${imagePath}`);
   console.log(`[SadTalker] Audio: ${audioPath}`);
 
-  return new Promise((resolve, reject) => {
-    const args = [
-      SADTALKER_SCRIPT,
-      "--image", imagePath,
-      "--audio", audioPath,
-      "--output", outputPath,
-      "--size", String(size),
-      "--preprocess", "crop",
-      "--batch-size", "1", // Lower batch for CPU
-    ];
-
-    if (options.enhancer) {
-      args.push("--enhancer", options.enhancer);
+  await runSadTalkerJob({
+    image: imagePath,
+    audio: audioPath,
+    output: outputPath,
+    size,
+    preprocess: "crop",
+    // batch_size omitted: the script sizes it from free VRAM (1 on CPU)
+    ...(options.enhancer ? { enhancer: options.enhancer } : {}),
+  });
+  if (!existsSync(outputPath)) {
+    throw new Error("SadTalker failed: no output written");
+  }
+
+  // Get video duration from file size estimate (roughly 1MB per 10s of video)
+  let durationMs = 10000;
+  try {
+    const stats = await stat(outputPath);
+    durationMs = Math.max(3000, (stats.size / 100000) * 1000);
+  } catch {
+    // Use default
+  }
+
+  console.log(`[SadTalker] Talking head saved: ${filename}`);
+  return {
+    sceneNumber,
+    videoUrl: `/uploads/cartoons/${filename}`,
+    durationMs,
+  };
+}
+
+// ── Persistent SadTalker worker ──
+// `sadtalker_generate.py --server` keeps the models loaded between scenes instead of
+// paying the 5-15s load on every spawn. Jobs run one at a time, in order.
+
+interface PendingJob {
+  resolve: () => void;
+  reject: (err: Error) => void;
+}
+
+interface SadTalkerWorker {
+  proc: ChildProcessWithoutNullStreams;
+  pending: Map<number, PendingJob>;
+  stderr: string;
+  idleTimer: NodeJS.Timeout | null;
+}
+
+let _worker: SadTalkerWorker | null = null;
+let _nextJobId = 1;
+
+function stopWorker(worker: SadTalkerWorker, reason: string): void {
+  if (_worker === worker) _worker = null;
+  if (worker.idleTimer) clearTimeout(worker.idleTimer);
+  for (const job of worker.pending.values()) {
+    job.reject(new Error(reason));
+  }
+  worker.pending.clear();
+  if (worker.proc.exitCode === null) worker.proc.kill("SIGTERM");
+}
+
+function getWorker(): SadTalkerWorker {
+  if (_worker) return _worker;
+
+  const proc = spawn(PYTHON_PATH, [SADTALKER_SCRIPT, "--server"], {
+    env: { ...process.env, SADTALKER_PATH: SADTALKER_PATH },
+    windowsHide: true,
+    cwd: process.cwd(),
+  });
+  const worker: SadTalkerWorker = { proc, pending: new Map(), stderr: "", idleTimer: null };
+  _worker = worker;
+
+  createInterface({ input: proc.stdout }).on("line", (line) => {
+    let reply: { id?: number; ok?: boolean; error?: string };
+    try {
+      reply = JSON.parse(line);
+    } catch {
+      return; // stray output, not a reply
     }
+    const job = reply.id != null ? worker.pending.get(reply.id) : undefined;
+    if (!job) return;
+    worker.pending.delete(reply.id!);
+    if (reply.ok) {
+      job.resolve();
+    } else {
+      const errorMsg = reply.error || "unknown error";
+      console.error(`[SadTalker] Error: ${errorMsg.slice(-500)}`);
+      job.reject(new Error(`SadTalker failed: ${errorMsg.slice(-300)}`));
+    }
+    scheduleIdleStop(worker);
+  });
 
-    const env = {
-      ...process.env,
-      SADTALKER_PATH: SADTALKER_PATH,
-    };
+  // Progress output (and tracebacks) arrive on stderr
+  createInterface({ input: proc.stderr }).on("line", (line) => {
+    if (line.trim()) console.log(`[SadTalker] ${line.trim()}`);
+    // Keep only the tail so a long-lived worker doesn't grow without bound
+    worker.stderr = (worker.stderr + line + "\n").slice(-4000);
+  });
 
-    const proc = spawn(PYTHON_PATH, args, {
-      env,
-      windowsHide: true,
-      cwd: process.cwd(),
-    });
+  // Writes after the worker died surface through "close"; don't crash on EPIPE
+  proc.stdin.on("error", () => {});
+
+  proc.on("error", (err) => {
+    stopWorker(worker, `Failed to start SadTalker: ${err.message}`);
+  });
 
-    let stdout = "";
-    let stderr = "";
+  proc.on("close", (code) => {
+    const errorMsg = worker.stderr || `SadTalker exited with code ${code}`;
+    stopWorker(worker, `SadTalker failed: ${errorMsg.slice(-300)}`);
+  });
 
-    proc.stdout.on("data", (data) => {
-      const text = data.toString();
-      stdout += text;
-      console.log(`[SadTalker] ${text.trim()}`);
-    });
+  return worker;
+}
 
-    proc.stderr.on("data", (data) => {
-      stderr += data.toString();
-    });
+function scheduleIdleStop(worker: SadTalkerWorker): void {
+  if (worker.idleTimer) clearTimeout(worker.idleTimer);
+  worker.idleTimer = null;
+  if (worker.pending.size > 0) return;
+  worker.idleTimer = setTimeout(() => stopWorker(worker, "SadTalker worker stopped (idle)"), WORKER_IDLE_MS);
+  worker.idleTimer.unref();
+}
 
-    proc.on("error", (err) => {
-      reject(new Error(`Failed to start SadTalker: ${err.message}`));
-    });
+function runSadTalkerJob(job: Record<string, string | number | boolean>): Promise<void> {
+  const worker = getWorker();
+  if (worker.idleTimer) {
+    clearTimeout(worker.idleTimer);
+    worker.idleTimer = null;
+  }
+  const id = _nextJobId++;
 
-    proc.on("close", async (code) => {
-      if (code === 0 && existsSync(outputPath)) {
-        // Get video duration from file size estimate (roughly 1MB per 10s of video)
-        let durationMs = 10000;
-        try {
-          const stats = await stat(outputPath);
-          durationMs = Math.max(3000, (stats.size / 100000) * 1000);
-        } catch {
-          // Use default
-        }
-
-        console.log(`[SadTalker] Talking head saved: ${filename}`);
-        resolve({
-          sceneNumber,
-          videoUrl: `/uploads/cartoons/${filename}`,
-          durationMs,
-        });
-      } else {
-        const errorMsg = stderr || stdout || `SadTalker exited with code ${code}`;
-        console.error(`[SadTalker] Error: ${errorMsg.slice(-500)}`);
-        reject(new Error(`SadTalker failed: ${errorMsg.slice(-300)}`));
-      }
-    });
+  return new Promise((resolve, reject) => {
+    worker.pending.set(id, { resolve, reject });
+    worker.proc.stdin.write(JSON.stringify({ id, ...job }) + "\n");
   });
 }
 
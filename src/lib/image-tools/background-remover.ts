@@ -2,10 +2,12 @@
  * Background Remover
  *
  * Uses rembg Python library to remove image backgrounds.
- * Called via child_process.spawn, same pattern as AnimatedDrawings and SadTalker.
+ * Runs a long-lived `remove_background.py --server` worker so the ONNX model is
+ * loaded once and reused across requests instead of on every spawn.
  */
 
-import { spawn, execSync } from "child_process";
+import { spawn, execSync, type ChildProcessWithoutNullStreams } from "child_process";
+import { createInterface } from "readline";
 import { mkdir, unlink } from "fs/promises";
 import { existsSync, readFileSync } from "fs";
 import path from "path";
@@ -15,6 +17,7 @@ import { resolveToLocalPath } from "@/lib/utils/s3-client";
 const PYTHON_PATH = process.env.REMBG_PYTHON_PATH || (process.platform === "win32" ? "python" : "python3");
 const SCRIPT_PATH = path.join(process.cwd(), "scripts", "remove_background.py");
 const TIMEOUT_MS = 120_000; // 2 minutes
+const WORKER_IDLE_MS = 10 * 60_000; // free the model after 10 idle minutes
 
 export type BgRemovalModel =
   | "u2net"
@@ -84,53 +87,144 @@ export async function removeBackground(
   const outputPath = path.join(outputDir, outputFilename);
   const outputUrl = `/uploads/bg-removed/${outputFilename}`;
 
-  return new Promise((resolve, reject) => {
-    const args = [
-      SCRIPT_PATH,
-      "--input",
-      resolvedInput,
-      "--output",
-      outputPath,
-      "--model",
-      model,
-    ];
-
-    const proc = spawn(PYTHON_PATH, args, {
-      windowsHide: true,
-      cwd: process.cwd(),
-    });
+  await runWorkerRequest({ input: resolvedInput, output: outputPath, model });
+  if (!existsSync(outputPath)) {
+    throw new Error("Background removal failed: no output written");
+  }
+  return { outputPath, outputUrl };
+}
 
-    let stdout = "";
-    let stderr = "";
+// ── Persistent worker ──
 
-    proc.stdout.on("data", (data) => {
-      stdout += data.toString();
-    });
+interface WorkerRequest {
+  payload: { input: string; output: string; model: string };
+  resolve: () => void;
+  reject: (err: Error) => void;
+}
 
-    proc.stderr.on("data", (data) => {
-      stderr += data.toString();
-    });
+interface ActiveRequest {
+  id: number;
+  request: WorkerRequest;
+  timer: NodeJS.Timeout;
+}
 
-    proc.on("error", (err) => {
-      reject(new Error(`Failed to start background remover: ${err.message}`));
-    });
+interface Worker {
+  proc: ChildProcessWithoutNullStreams;
+  // The worker handles one request at a time; the rest wait here so each
+  // request's timeout only starts once it is actually sent
+  queue: WorkerRequest[];
+  active: ActiveRequest | null;
+  stderr: string;
+  idleTimer: NodeJS.Timeout | null;
+}
 
-    const timer = setTimeout(() => {
-      proc.kill("SIGTERM");
-      reject(new Error("Background removal timed out"));
-    }, TIMEOUT_MS);
-
-    proc.on("close", (code) => {
-      clearTimeout(timer);
-      if (code === 0 && existsSync(outputPath)) {
-        resolve({ outputPath, outputUrl });
-      } else {
-        reject(
-          new Error(
-            `Background removal failed: ${stderr || stdout || `exit code ${code}`}`
-          )
-        );
-      }
-    });
+let _worker: Worker | null = null;
+let _nextRequestId = 1;
+
+function stopWorker(worker: Worker, reason: string): void {
+  if (_worker === worker) _worker = null;
+  if (worker.idleTimer) clearTimeout(worker.idleTimer);
+  if (worker.active) {
+    clearTimeout(worker.active.timer);
+    worker.active.request.reject(new Error(reason));
+    worker.active = null;
+  }
+  for (const request of worker.queue) request.reject(new Error(reason));
+  worker.queue = [];
+  if (worker.proc.exitCode === null) worker.proc.kill("SIGTERM");
+}
+
+function getWorker(): Worker {
+  if (_worker) return _worker;
+
+  const proc = spawn(PYTHON_PATH, [SCRIPT_PATH, "--server"], {
+    windowsHide: true,
+    cwd: process.cwd(),
+  });
+  const worker: Worker = { proc, queue: [], active: null, stderr: "", idleTimer: null };
+  _worker = worker;
+
+  createInterface({ input: proc.stdout }).on("line", (line) => {
+    let reply: { id?: number; ok?: boolean; error?: string };
+    try {
+      reply = JSON.parse(line);
+    } catch {
+      return; // stray output, not a reply
+    }
+    const active = worker.active;
+    if (!active || reply.id !== active.id) return;
+    clearTimeout(active.timer);
+    worker.active = null;
+    if (reply.ok) {
+      active.request.resolve();
+    } else {
+      active.request.reject(new Error(`Background removal failed: ${reply.error || "unknown error"}`));
+    }
+    sendNext(worker);
+  });
+
+  proc.stderr.on("data", (data) => {
+    // Keep only the tail so a long-lived worker doesn't grow without bound
+    worker.stderr = (worker.stderr + data.toString()).slice(-4000);
   });
+
+  // Writes after the worker died surface through "close"; don't crash on EPIPE
+  proc.stdin.on("error", () => {});
+
+  proc.on("error", (err) => {
+    stopWorker(worker, `Failed to start background remover: ${err.message}`);
+  });
+
+  proc.on("close", (code) => {
+    stopWorker(
+      worker,
+      `Background removal failed: ${worker.stderr || `exit code ${code}`}`
+    );
+  });
+
+  return worker;
+}
+
+function sendNext(worker: Worker): void {
+  if (worker.active) return;
+  const request = worker.queue.shift();
+  if (!request) {
+    scheduleIdleStop(worker);
+    return;
+  }
+
+  const id = _nextRequestId++;
+  const timer = setTimeout(() => {
+    // The stuck request blocks the worker: fail only it, restart the worker
+    // and hand the requests still waiting to the new one
+    worker.active = null;
+    request.reject(new Error("Background removal timed out"));
+    const waiting = worker.queue;
+    worker.queue = [];
+    stopWorker(worker, "Background removal timed out");
+    for (const next of waiting) enqueue(next);
+  }, TIMEOUT_MS);
+
+  worker.active = { id, request, timer };
+  worker.proc.stdin.write(JSON.stringify({ id, ...request.payload }) + "\n");
+}
+
+function scheduleIdleStop(worker: Worker): void {
+  if (worker.idleTimer) clearTimeout(worker.idleTimer);
+  worker.idleTimer = setTimeout(() => stopWorker(worker, "Background remover stopped (idle)"), WORKER_IDLE_MS);
+  worker.idleTimer.unref();
+}
+
+function enqueue(request: WorkerRequest): void {
+  const worker = getWorker();
+  if (worker.idleTimer) {
+    clearTimeout(worker.idleTimer);
+    worker.idleTimer = null;
+  }
+  worker.queue.push(request);
+  sendNext(worker);
+}
+
+function runWorkerRequest(payload: { input: string; output: string; model: string }): Promise<void> {
+  return new Promise((resolve, reject) => enqueue({ payload, resolve, reject }));
 }